@@ -2,55 +2,68 @@
 # -*- coding: utf-8 -*-
 
 # Import necessary packages
+import os
 import re
 import json
+import heapq
+import pickle
+import hashlib
+import argparse
 import collections
 import numpy as np
 import pandas as pd
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from text_normalizer import remove_punctuation_batch, split_English_batch
 
+SOURCE_FORMATS = ('csv', 'xls', 'xls_sheet', 'txt', 'json')
 
-def read_txt(path_txt: str) -> np.array:
+
+def read_txt(path_txt: str, usecols=None) -> np.array:
     """
     Read the TXT file and convert it into numpy array
     :param path_txt: The path of the TXT file
+    :param usecols: The columns to be read, all the columns if it's None
     :return txt: The TXT info as numpy array
     """
-    txt = pd.read_table(path_txt, encoding='utf-8', keep_default_na=False)
+    txt = pd.read_table(path_txt, encoding='utf-8', keep_default_na=False, usecols=usecols)
     txt = np.array(txt)
     return txt
 
 
-def read_csv(path_txt: str) -> np.array:
+def read_csv(path_txt: str, usecols=None) -> np.array:
     """
     Read the CSV file and convert it into numpy array
     :param path_txt: The path of the CSV file
+    :param usecols: The columns to be read, all the columns if it's None
     :return txt: The CSV info as numpy array
     """
-    csv = pd.read_csv(path_txt, encoding='utf-8', keep_default_na=False)
+    csv = pd.read_csv(path_txt, encoding='utf-8', keep_default_na=False, usecols=usecols)
     csv = np.array(csv)
     return csv
 
 
-def read_xls(path_txt: str) -> np.array:
+def read_xls(path_txt: str, usecols=None) -> np.array:
     """
     Read the XLS file and convert it into numpy array
     :param path_txt: The path of the XLS file
+    :param usecols: The columns to be read, all the columns if it's None
     :return txt: The XLS info as the numpy array
     """
-    xls = pd.read_excel(path_txt, keep_default_na=False)
+    xls = pd.read_excel(path_txt, keep_default_na=False, usecols=usecols)
     xls = np.array(xls)
     return xls
 
 
-def read_xls_sheet(path_txt: str, sheet_name: str) -> np.array:
+def read_xls_sheet(path_txt: str, sheet_name: str, usecols=None) -> np.array:
     """
     Read the xls' sheet file and convert it into numpy array
     :param sheet_name: The sheet name of the xls file
     :param path_txt: The path of the xls file
+    :param usecols: The columns to be read, all the columns if it's None
     :return txt: The xls sheet info as numpy array
     """
-    xls = pd.read_excel(path_txt, header=None, sheet_name=sheet_name, keep_default_na=False)
+    xls = pd.read_excel(path_txt, header=None, sheet_name=sheet_name, keep_default_na=False, usecols=usecols)
     xls = np.array(xls)
     return xls
 
@@ -88,45 +101,139 @@ def KG_words(json: dict) -> list:
     return words
 
 
-def Q2B(uchar):
+def read_manifest(path: str) -> list:
+    """
+    Read the manifest of the terminology sources (JSON)
+        {"sources": [{"path": ..., "format": ..., "sheet": ..., "column": ...}, ...]}
+    format: 'csv', 'xls', 'xls_sheet', 'txt', or 'json' (the Knowledge Graph, no column)
+    sheet: The sheet name, only for 'xls_sheet'
+    column: The index of the term column
+    :param path: The path of the manifest
+    :return sources: The sources
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        manifest = json.load(fp)
+
+    sources = []
+    for source in manifest['sources']:
+        if source['format'] not in SOURCE_FORMATS:
+            raise ValueError('Unknown source format: {}'.format(source['format']))
+        if source['format'] != 'json' and 'column' not in source:
+            raise ValueError('The term column of {} is missing'.format(source['path']))
+        sources.append({'path': source['path'], 'format': source['format'],
+                        'sheet': source.get('sheet'), 'column': source.get('column')})
+    return sources
+
+
+def read_source(source: dict) -> list:
+    """
+    Read the terms of one source file, only the term column is read
+    :param source: The source, see read_manifest()
+    :return terms: The term list
+    """
+    path, column = source['path'], source['column']
+    if source['format'] == 'json':
+        return KG_words(json=read_json(path=path))
+    elif source['format'] == 'csv':
+        data = read_csv(path_txt=path, usecols=[column])
+    elif source['format'] == 'xls':
+        data = read_xls(path_txt=path, usecols=[column])
+    elif source['format'] == 'xls_sheet':
+        data = read_xls_sheet(path_txt=path, sheet_name=source['sheet'], usecols=[column])
+    else:
+        data = read_txt(path_txt=path, usecols=[column])
+    return data[:, 0].tolist()
+
+
+def file_sha256(path: str) -> str:
     """
-    Convert the full-width to half-width
+    Get the SHA-256 hash of a file
     """
-    inside_code = ord(uchar)
-    if inside_code == 0x3000:
-        inside_code = 0x0020
-    else:
-        inside_code -= 0xfee0
-    if inside_code < 0x0020 or inside_code > 0x7e:
-        return uchar
-    return chr(inside_code)
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def source_cache_path(source: dict, cache_dir: str) -> str:
+    """
+    Get the cache path of the terms of a source, w.r.t. its path, format, sheet name and term column
+    """
+    spec = (source['path'], source['format'], source['sheet'], source['column'])
+    key = hashlib.sha256(repr(spec).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, 'terms-' + key + '.pkl')
+
+
+def load_cached_terms(source: dict, cache_dir: str):
+    """
+    Load the cached terms of a source if the source file is unchanged
+    The modification time is checked first, and the hash if the modification time has changed
+    :return terms: The term list, None if there was no valid cache
+    """
+    cache_path = source_cache_path(source=source, cache_dir=cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, 'rb') as fp:
+        cache = pickle.load(fp)
 
+    stat = os.stat(source['path'])
+    if cache['size'] == stat.st_size and cache['mtime'] == stat.st_mtime_ns:
+        return cache['terms']
+    if cache['size'] == stat.st_size and cache['sha256'] == file_sha256(path=source['path']):
+        save_cached_terms(source=source, cache_dir=cache_dir, terms=cache['terms'])
+        return cache['terms']
+    return None
 
-def stringQ2B(ustring):
+
+def save_cached_terms(source: dict, cache_dir: str, terms: list):
+    """
+    Save the terms of a source, with the size, modification time and hash of the source file
     """
-    Convert full-width to half-width for a sentence or string
+    stat = os.stat(source['path'])
+    cache = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': file_sha256(path=source['path']), 'terms': terms}
+    cache_path = source_cache_path(source=source, cache_dir=cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_path + '.tmp', 'wb') as fp:
+        pickle.dump(cache, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_path + '.tmp', cache_path)
+
+
+def iter_terms(sources: list, workers: int, cache_dir='cache/'):
     """
-    return "".join([Q2B(uchar) for uchar in ustring])
+    Stream the terms of all the sources, in the order of the sources
+    The unchanged sources are loaded from the cache, and only the changed ones are parsed (in a process pool)
+    :param sources: The sources, see read_manifest()
+    :param workers: Number of the worker processes
+    :param cache_dir: The folder of the cached terms
+    :return: The generator of the terms
+    """
+    cached = [load_cached_terms(source=source, cache_dir=cache_dir) for source in sources]
+    changed = [source for source, terms in zip(sources, cached) if terms is None]
+    print('%s of %s sources are unchanged, %s sources to be parsed.' % (len(sources) - len(changed), len(sources), len(changed)))
+
+    # All the sources are cached, no process pool is started
+    if changed == []:
+        for terms in cached:
+            yield from terms
+        return
+
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(changed)))) as executor:
+        parsed = executor.map(read_source, changed)
+        for source, terms in zip(sources, cached):
+            if terms is None:
+                terms = next(parsed)
+                save_cached_terms(source=source, cache_dir=cache_dir, terms=terms)
+            yield from terms
 
 
 def remove_punctuation(term: list) -> list:
     """
-    Remove the punctuations from a term list
+    Convert the full-width to half-width, and remove the punctuations (and spaces) from a term list
     :param term: The term list
     :return term: The term list that removed the punctuations
     """
-    punctuation = ['(', ')', '[', ']', '，', '。', '！', ',', '.', '!', '_', ' ', '\n', '-', '/', '',
-                   '?', '？', ':', '：', '{', '}', '「', '」', '@', '#', '$', '%', '^', '&', '*', '[]',
-                   '+', '=', '"', '~', '`', '|', '<', '>', '……', '￥', '〔', '〕', '“', '”', '—', '\\',
-                   "'", ';', '、', '↓', '≤', '≥', '①', '②', '─', '【', '】', '°', '·', '…', '﹒', '､',
-                   '『', '』', '｜', '_']
-
-    for i in range(len(term)):
-        term[i] = stringQ2B(term[i])
-        for j in punctuation:
-            if j in term[i]:
-                term[i] = term[i].replace(j, '')
-    return term
+    return remove_punctuation_batch(terms=term, remove_space=True, to_half_width=True)
 
 
 def find_English_term(term: list) -> tuple:
@@ -137,17 +244,8 @@ def find_English_term(term: list) -> tuple:
     :return term: the term removed the English and numbers
     :return Eng_terms: the removed English
     """
-    temp_terms = []
-    Eng_terms = []
-    for i in range(len(term)):
-        string = term[i]
-        result = re.findall(r'[a-zA-Z0-9]+', string)
-        for j in result:
-            temp_terms.append(j)
-            term[i] = re.sub(pattern=j, repl='', string=term[i])
-    temp_terms = set(temp_terms)
-    for k in temp_terms:
-        Eng_terms.append(k)
+    term, Eng_in_terms = split_English_batch(terms=term)
+    Eng_terms = list(set(j for Eng_in_term in Eng_in_terms for j in Eng_in_term))
     return term, Eng_terms
 
 
@@ -181,34 +279,175 @@ def make_vocab(dict_term: dict) -> dict:
     return temp_dict
 
 
-def get_pairs(vocab: dict) -> dict:
-    """
-    Get the pairs and their frequency of the vocabulary
-    :param vocab: The input vocabulary
-    :return pairs: Pairs and their frequency
+def merge_symbols(symbols: list, pair: tuple) -> list:
     """
-    pairs = collections.defaultdict(int)
-    for word, freq in vocab.items():
-        symbols = word.split()
+    Merge the pair in the symbols of a word (from left to right, without overlapping)
+    For example, ['a', 'a', 'a'] and ('a', 'a') ------> ['aa', 'a']
+    :param symbols: The symbols of a word
+    :param pair: one character pair, e.g., the most frequent character pair
+    :return merged: The symbols after merge
+    """
+    merged = []
+    i = 0
+    while i < len(symbols):
+        if i < len(symbols) - 1 and symbols[i] == pair[0] and symbols[i + 1] == pair[1]:
+            merged.append(symbols[i] + symbols[i + 1])
+            i += 2
+        else:
+            merged.append(symbols[i])
+            i += 1
+    return merged
+
+
+class BPE_Trainer:
+    """
+    Byte Pair Encoding (BPE) with incremental pair counts
+    The pair counts and the [pair -> words] index are kept across merges,
+    and only the words containing the merged pair are updated.
+    The most frequent pair is taken from a priority queue; among the pairs of the same frequency,
+    the pair that occurs first in the vocabulary is taken, exactly as max() over the recounted pairs does
+    """
+    def __init__(self, vocab: dict):
+        """
+        :param vocab: The input vocabulary, e.g., {'1 2 3': 10}
+        """
+        self.texts = list(vocab.keys())
+        self.words = [word.split() for word in self.texts]
+        self.freqs = list(vocab.values())
+        self.pair_counts = collections.defaultdict(int)
+        self.pair_words = collections.defaultdict(set)
+        for index in range(len(self.words)):
+            self.add_word(index=index, changed=set())
+
+        self.heap = [(-count, pair) for pair, count in self.pair_counts.items()]
+        heapq.heapify(self.heap)
+
+    def add_word(self, index: int, changed: set):
+        """
+        Add the pairs of a word to the pair counts and the [pair -> words] index
+        """
+        symbols = self.words[index]
+        for pair in zip(symbols, symbols[1:]):
+            self.pair_counts[pair] += self.freqs[index]
+            self.pair_words[pair].add(index)
+            changed.add(pair)
+
+    def remove_word(self, index: int, changed: set):
+        """
+        Remove the pairs of a word from the pair counts and the [pair -> words] index
+        """
+        symbols = self.words[index]
+        for pair in zip(symbols, symbols[1:]):
+            self.pair_counts[pair] -= self.freqs[index]
+            self.pair_words[pair].discard(index)
+            changed.add(pair)
+
+    def first_occurrence(self, pair: tuple) -> tuple:
+        """
+        Get the first occurrence [word index, symbol index] of the pair in the vocabulary
+        """
+        index = min(self.pair_words[pair])
+        symbols = self.words[index]
         for i in range(len(symbols) - 1):
-            pairs[symbols[i], symbols[i + 1]] += freq
-    return pairs
+            if (symbols[i], symbols[i + 1]) == pair:
+                return index, i
+
+    def pop_best_pair(self) -> tuple:
+        """
+        Pop the most frequent pair from the priority queue
+        :return: The most frequent pair and its frequency, (None, 0) if there was no pair
+        """
+        # Discard the outdated entries
+        while self.heap and self.pair_counts.get(self.heap[0][1], 0) != -self.heap[0][0]:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None, 0
+
+        # Resolve the ties in the order of the vocabulary
+        max_freq = -self.heap[0][0]
+        tied = set()
+        while self.heap and self.heap[0][0] == -max_freq:
+            _, pair = heapq.heappop(self.heap)
+            if self.pair_counts.get(pair, 0) == max_freq:
+                tied.add(pair)
+        best_pair = min(tied, key=self.first_occurrence)
+        for pair in tied:
+            if pair != best_pair:
+                heapq.heappush(self.heap, (-max_freq, pair))
+        return best_pair, max_freq
+
+    def merge(self, pair: tuple):
+        """
+        Merge the pair in all the words containing it, and update the pair counts
+        """
+        # The text of the word is merged as well, so that the other whitespaces are kept
+        bigram = re.escape(' '.join(pair))
+        p = re.compile(r'(?<!\S)' + bigram + r'(?!\S)')
+
+        changed = set()
+        for index in list(self.pair_words[pair]):
+            self.remove_word(index=index, changed=changed)
+            self.words[index] = merge_symbols(symbols=self.words[index], pair=pair)
+            self.texts[index] = p.sub(''.join(pair), self.texts[index])
+            self.add_word(index=index, changed=changed)
+
+        for changed_pair in changed:
+            count = self.pair_counts[changed_pair]
+            if count > 0:
+                heapq.heappush(self.heap, (-count, changed_pair))
+            else:
+                del self.pair_counts[changed_pair]
+                del self.pair_words[changed_pair]
+
+    def get_vocab(self) -> dict:
+        """
+        Get the vocabulary after merge, e.g., {'12 3': 10}
+        """
+        merged_vocab = {}
+        for text, freq in zip(self.texts, self.freqs):
+            merged_vocab[text] = freq
+        return merged_vocab
+
+
+def train_bpe(vocab: dict, thresholds: list):
+    """
+    Merge the most frequent pairs in one run, down to the lowest threshold
+    A snapshot is taken for each threshold, once the frequency of the merged pair is not larger than it,
+    i.e., the same result as a separate run with that stop frequency
+    :param vocab: The input vocabulary, e.g., {'1 2 3': 10}
+    :param thresholds: The stop frequencies, e.g., [500, 200, 10]
+    :return: Generator of the snapshots, (threshold, pair_chars, merged_vocab, max_freq) from the highest threshold
+             pair_chars: The merged pairs in order
+             merged_vocab: The vocabulary after merge
+             max_freq: The frequency of the last merged pair
+    """
+    thresholds = sorted(set(thresholds), reverse=True)
+    trainer = BPE_Trainer(vocab=vocab)
+    max_freq = 10000
+    merge_index = 0
+    pair_chars = []
+    while thresholds != []:
+        # Take the snapshots of the reached thresholds
+        if max_freq <= thresholds[0]:
+            yield thresholds.pop(0), list(pair_chars), trainer.get_vocab(), max_freq
+            continue
 
+        # Get the maximum frequency character pair
+        max_freq_pair, freq = trainer.pop_best_pair()
+        if max_freq_pair is None:
+            # No pair to merge, the remaining thresholds share the final vocabulary
+            max_freq = 0
+            continue
 
-def merge_pair(pair: tuple, voc_in: dict) -> dict:
-    """
-    Merge the most frequent pair
-    :param pair: one character pair, e.g., the most frequent character pair
-    :param voc_in: Input vocabulary
-    :return voc_out: Output vocabulary after merge
-    """
-    voc_out = {}
-    bigram = re.escape(' '.join(pair))
-    p = re.compile(r'(?<!\S)' + bigram + r'(?!\S)')
-    for word in voc_in:
-        w_out = p.sub(''.join(pair), word)
-        voc_out[w_out] = voc_in[word]
-    return voc_out
+        # Update current max frequency
+        max_freq = freq
+
+        merge_index += 1
+        print(merge_index, max_freq_pair, max_freq)
+        pair_chars.append(max_freq_pair)
+
+        # Merge the most frequent two characters (bigram)
+        trainer.merge(pair=max_freq_pair)
 
 
 def get_merged_subwords(vocab: dict) -> list:
@@ -261,85 +500,14 @@ def save_csv(csv_path: str, subword: np.array, subword_freq: np.array):
 
 # The main function
 if __name__ == '__main__':
-    # Read the Dataset from different files
-    data_path = 'data/'
-    path_1 = data_path + 'ICD-O-3形态学编码.csv'
-    path_2 = data_path + '北京市住院病案首页手术操作名称与代码标准v5.0.xls'
-    path_3 = data_path + '北京市住院病案首页手术操作名称与代码标准V6.01版本.xls'
-    path_4 = data_path + '北京版RC022-ICD-9手术编码.xls'
-    path_5 = data_path + '广东省ICD-9-CM-3手术与操作代码(2016版).xls'
-    path_6 = data_path + '广东省ICD-9-CM-3手术与操作代码(2017版).xls'
-    path_7 = data_path + '手术操作编码ICD-9-CM-3(2017维护版).xls'
-    path_8 = data_path + '上海2018年手术操作与代码标准库.xlsx'
-    path_9 = data_path + '北京版手术操作名称v6.0.xlsx'
-    path_10 = data_path + '四川省ICD手术编码.xlsx'
-    path_11 = data_path + '国标1.0-手术操作分类代码国家临床版1.0.xlsx'
-    path_12 = data_path + '国际疾病分类第十一次修订本（ICD-11）中文版.xlsx'
-    path_13 = data_path + '山东省-临床版国际疾病分类ICD-9-CM-3(V6.01版).xlsx'
-    path_14 = data_path + '山东省医疗机构手术操作分类代码及级别目录(2018).xlsx'
-    path_15 = data_path + '手术操作分类与代码 全国2017版.xlsx'
-    path_16 = data_path + '手术操作分类代码国家临床版1.1.xlsx'
-    path_17 = data_path + '手术操作分类代码国家临床版2.0.xlsx'
-    path_18 = data_path + 'OMAHA术语集_术语_完整版_20180720.txt'
-    path_19 = data_path + '成人（造影、负荷、心超）.xls'
-
-    txt_1 = read_csv(path_txt=path_1)
-    txt_2 = read_xls(path_txt=path_2)
-    txt_3 = read_xls(path_txt=path_3)
-    txt_4 = read_xls(path_txt=path_4)
-    txt_5 = read_xls(path_txt=path_5)
-    txt_6 = read_xls(path_txt=path_6)
-    txt_7 = read_xls(path_txt=path_7)
-    txt_8 = read_xls(path_txt=path_8)
-    txt_9 = read_xls(path_txt=path_9)
-    txt_10 = read_xls(path_txt=path_10)
-    txt_11 = read_xls(path_txt=path_11)
-    txt_12 = read_xls(path_txt=path_12)
-    txt_13 = read_xls(path_txt=path_13)
-    txt_14 = read_xls(path_txt=path_14)
-    txt_15 = read_xls(path_txt=path_15)
-    txt_16 = read_xls(path_txt=path_16)
-
-    txt_17 = read_xls_sheet(path_txt=path_17, sheet_name='2.0')
-    txt_18 = read_xls_sheet(path_txt=path_17, sheet_name='信息中心（20170125）')
-    txt_19 = read_xls_sheet(path_txt=path_17, sheet_name='补丁1')
-    txt_20 = read_xls_sheet(path_txt=path_17, sheet_name='补丁2')
-    txt_21 = read_xls_sheet(path_txt=path_17, sheet_name='停用及修订')
-
-    txt_22 = read_txt(path_txt=path_18)
-    txt_23 = read_xls(path_txt=path_19)
-    json_data = read_json(data_path + 'onto_resource_0.0.3.json')
-
-    term_1 = txt_1[:, 1]
-    term_2 = txt_2[:, 1]
-    term_3 = txt_3[:, 1]
-    term_4 = txt_4[:, 1]
-    term_5 = txt_5[:, 1]
-    term_6 = txt_6[:, 1]
-    term_7 = txt_7[:, 1]
-    term_8 = txt_8[:, 1]
-    term_9 = txt_9[:, 0]
-    term_10 = txt_10[:, 2]
-    term_11 = txt_11[:, 2]
-    term_12 = txt_12[:, 1]
-    term_13 = txt_13[:, 2]
-    term_14 = txt_14[:, 2]
-    term_15 = txt_15[:, 2]
-    term_16 = txt_16[:, 1]
-    term_17 = txt_17[:, 2]
-    term_18 = txt_18[:, 2]
-    term_19 = txt_19[:, 2]
-    term_20 = txt_20[:, 2]
-    term_21 = txt_21[:, 1]
-    term_22 = txt_22[:, 4]
-    term_23 = txt_23[:, 3]
-
-    KGwords = KG_words(json=json_data)
-
-    term = np.concatenate([term_1, term_2, term_3, term_4, term_5, term_6,
-                           term_7, term_8, term_9, term_10, term_11, term_12,
-                           term_13, term_14, term_15, term_16, term_17, term_18,
-                           term_19, term_20, term_21, term_22, term_23, KGwords])
+    # Read the terms of the sources listed in the manifest (unchanged sources are loaded from the cache)
+    parser = argparse.ArgumentParser(description='Get the sub-word (frequency) lists from the terminology sources')
+    parser.add_argument('--manifest', default='sources.json', help='The manifest of the terminology sources')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of the worker processes')
+    args = parser.parse_args()
+
+    sources = read_manifest(path=args.manifest)
+    term = np.array(list(iter_terms(sources=sources, workers=args.workers)), dtype=object)
 
     ####################################################################################################################################
     # Remove English from the term
@@ -373,47 +541,27 @@ if __name__ == '__main__':
     # Make dictionary vocabulary (Word -> Characters)
     vocab = make_vocab(dict_term=dict_term)
 
-    # Set the number of operations
-    max_freq = 10000
-    merged_vocab = vocab
-    merge_index = 0
-
-    pair_chars = []
-    while max_freq > 500:
-        # Get pairs for the vocabulary
-        pairs = get_pairs(vocab=merged_vocab)
-
-        # Get the maximum frequency character pair
-        max_freq_pair = max(pairs, key=pairs.get)
-
-        # Update current max frequency
-        max_freq = pairs.get(max_freq_pair)
-
-        merge_index += 1
-        print(merge_index, max_freq_pair, pairs.get(max_freq_pair))
-        pair_chars.append(max_freq_pair)
-
-        # Merge the most frequent two characters (bigram)
-        merged_vocab = merge_pair(pair=max_freq_pair, voc_in=merged_vocab)
-
-    ####################################################################################################################################
-    # Save the paired characters
-    pair_chars = pd.DataFrame(pair_chars)
-    pair_chars.to_csv('Combined_Characters_' + str(max_freq) + '.csv', sep=',', index=False, header=None)
+    # Merge the most frequent pairs in one run, and save the results w.r.t. every stop frequency
+    thresholds = [500, 400, 300, 200, 100, 20, 10]
+    for threshold, pair_chars, merged_vocab, max_freq in train_bpe(vocab=vocab, thresholds=thresholds):
+        ################################################################################################################################
+        # Save the paired characters
+        pair_chars = pd.DataFrame(pair_chars)
+        pair_chars.to_csv('Combined_Characters_' + str(threshold) + '.csv', sep=',', index=False, header=None)
 
-    # Get the merged subwords list (with repeated subwords)
-    merged_vocab_list = get_merged_subwords(vocab=merged_vocab)
+        # Get the merged subwords list (with repeated subwords)
+        merged_vocab_list = get_merged_subwords(vocab=merged_vocab)
 
-    # Get unrepeated subwords and their numbers
-    dict_subword = count_terms(terms=merged_vocab_list)
+        # Get unrepeated subwords and their numbers
+        dict_subword = count_terms(terms=merged_vocab_list)
 
-    # Get the merged subwords list (without repeated subwords)
-    subwords = get_merged_subwords(vocab=dict_subword)
+        # Get the merged subwords list (without repeated subwords)
+        subwords = get_merged_subwords(vocab=dict_subword)
 
-    # Get the subwords frequency w.r.t. each word
-    subword_freqs = get_subword_frequency(vocab=dict_subword)
+        # Get the subwords frequency w.r.t. each word
+        subword_freqs = get_subword_frequency(vocab=dict_subword)
 
-    # Save the subwords to CSV File
-    csv_path = 'subwords_freq_' + str(max_freq) + '.csv'
-    save_csv(csv_path=csv_path, subword=subwords, subword_freq=subword_freqs)
-    print('The ', csv_path, ' has been saved successfully!')
+        # Save the subwords to CSV File
+        csv_path = 'subwords_freq_' + str(threshold) + '.csv'
+        save_csv(csv_path=csv_path, subword=subwords, subword_freq=subword_freqs)
+        print('The ', csv_path, ' has been saved successfully! (The last merged pair frequency is', max_freq, ')')
@@ -1,11 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import re
 import json
 import numpy as np
 import pandas as pd
 import copy
+from utility import AhoCorasick
+from text_normalizer import remove_punctuation_batch, split_English_batch
 
 
 def read_json(path: str) -> dict:
@@ -62,44 +63,13 @@ def prefer_names(json: dict) -> list:
     return pre_names, pointer, length
 
 
-def Q2B(uchar):
-    """
-    Convert the full-width to half-width
-    """
-    inside_code = ord(uchar)
-    if inside_code == 0x3000:
-        inside_code = 0x0020
-    else:
-        inside_code -= 0xfee0
-    if inside_code < 0x0020 or inside_code > 0x7e:
-        return uchar
-    return chr(inside_code)
-
-
-def stringQ2B(ustring):
-    """
-    Convert full-width to half-width for a sentence or string
-    """
-    return "".join([Q2B(uchar) for uchar in ustring])
-
-
 def remove_punctuation(term: list) -> list:
     """
-    Remove the punctuations from the string
+    Remove the punctuations (and spaces) from the string
     :param term: the input term
     :return term: the term removed punctuations
     """
-    punctuation = ['(', ')', '[', ']', '，', '。', '！', ',', '.', '!', '_', ' ', '\n', '-', '/', '',
-                   '?', '？', ':', '：', '{', '}', '「', '」', '@', '#', '$', '%', '^', '&', '*', '[]',
-                   '+', '=', '"', '~', '`', '|', '<', '>', '……', '￥', '〔', '〕', '“', '”', '—', '\\',
-                   "'", ';', '、', '↓', '≤', '≥', '①', '②', '─', '【', '】', '°', '·', '…', '﹒', '､',
-                   '『', '』', '｜']
-
-    for i in range(len(term)):
-        for j in punctuation:
-            if j in term[i]:
-                term[i] = term[i].replace(j, '')
-    return term
+    return remove_punctuation_batch(terms=term, remove_space=True)
 
 
 def find_English_term(term: list) -> tuple:
@@ -108,63 +78,37 @@ def find_English_term(term: list) -> tuple:
     :param term: the input term
     :return term: the term removed English and numbers
     """
-    Eng_in_term = []
-    for i in range(len(term)):
-        string = term[i]
-        result = re.findall(r'[a-zA-Z0-9]+', string)
-
-        # Find the term and the English containing in the term
-        Eng_in_term.append(result)
+    return split_English_batch(terms=term)
 
-        # Remove the English from the term
-        for j in result:
-            term[i] = re.sub(pattern=j, repl='', string=term[i])
-    return term, Eng_in_term
 
-
-def kmp(m_str, s_str) -> int:
+def get_subword(pre_word: list, subword: list) -> list:
     """
-    The string matching algorithms
-    :param m_str: main string
-    :param s_str: pattern string
-    :return: matching location or -1 if there is no matching
+    Get the subwords of the words, the subwords are matched and removed in the order of the subword list
+    :param pre_word: the word list
+    :param subword: the subword list
+    :return pre_subs: the subwords w.r.t. each word
     """
-    next_ls = [-1] * len(s_str)
-    m = 1
-    s = 0
-
-    next_ls[0] = -1
-    while m < len(s_str) - 1:
-        if s_str[m] == s_str[s] or s == -1:
-            m += 1
-            s += 1
-            next_ls[m] = s
-        else:
-            s = next_ls[s]
-
-    i = j = 0
-    while i < len(m_str) and j < len(s_str):
-        if m_str[i] == s_str[j] or j == -1:
-            i += 1
-            j += 1
-        else:
-            j = next_ls[j]
+    # Compile the subword list once, and find all of them in one pass over the word
+    automaton = AhoCorasick(patterns=subword)
 
-    if j == len(s_str):
-        return i - j
-    return -1
-
-
-def get_subword(pre_word: list, subword: list) -> list:
     pre_subs = []
     for word in pre_word:
         temp_sub = []
         if len(word) != 0:
-            for sin_sub in subword:
-                loc = kmp(m_str=word, s_str=sin_sub)
-                if loc != -1 and len(sin_sub) != 0:
+            found = sorted(automaton.find(text=word))
+            index = 0
+            while index < len(found):
+                sub_id = found[index]
+                sin_sub = subword[sub_id]
+                if len(sin_sub) != 0:
                     temp_sub.append(sin_sub)
                     word = word.replace(sin_sub, '')
+
+                    # The remaining word may contain new matches, only the later subwords are visited
+                    found = [i for i in sorted(automaton.find(text=word)) if i > sub_id]
+                    index = 0
+                else:
+                    index += 1
         else:
             temp_sub.append('')
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import numpy as np
+
+# Bump the version when the way of building the artifacts changes
+CACHE_VERSION = '1'
+DIGEST_FILE = 'digests.json'
+
+
+def save_atomic(path: str, save_func):
+    """
+    Save a file through a temporary file, so that a reader never sees a partial file
+    :param path: The path of the file
+    :param save_func: The function writing the temporary file, save_func(temp_path)
+    """
+    temp_path = '%s.%d.tmp' % (path, os.getpid())
+    save_func(temp_path)
+    os.replace(temp_path, path)
+
+
+def file_digest(path: str, cache_dir: str) -> str:
+    """
+    Get the SHA-256 hash of the file
+    The hash is memoized w.r.t. the file size and modification time, so an unchanged file is not read again
+    :param path: The path of the file
+    :param cache_dir: The folder of the memoized hashes
+    :return: The hash of the file
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    digest_path = os.path.join(cache_dir, DIGEST_FILE)
+
+    digests = {}
+    if os.path.exists(digest_path):
+        with open(digest_path, 'r', encoding='utf-8') as fp:
+            digests = json.load(fp)
+    memo = digests.get(key)
+    if memo is not None and memo[0] == stat.st_size and memo[1] == stat.st_mtime_ns:
+        return memo[2]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            sha.update(block)
+    digests[key] = [stat.st_size, stat.st_mtime_ns, sha.hexdigest()]
+
+    def save_func(temp_path):
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(digests, fp)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_atomic(path=digest_path, save_func=save_func)
+    return sha.hexdigest()
+
+
+def artifact_key(inputs: list, cache_dir: str) -> str:
+    """
+    Get the key of an artifact from the hashes of its input files
+    :param inputs: The paths of the input files
+    :param cache_dir: The folder of the memoized hashes
+    :return: The key of the artifact
+    """
+    sha = hashlib.sha256(CACHE_VERSION.encode('utf-8'))
+    for path in inputs:
+        sha.update(file_digest(path=path, cache_dir=cache_dir).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def load_segmentation_cached(subword_embed, inputs: list, path: str, cache_dir='cache/') -> tuple:
+    """
+    Load the sub-words of the standard and synonym terms from the sidecar file of the Knowledge Base,
+    compute and save them if the Knowledge Base or the sub-words list has changed
+    :param subword_embed: The Subword_Embedding class
+    :param inputs: The paths of the Knowledge Base and the sub-words list
+    :param path: The path of the sidecar file, e.g., pre_words_dict-200.subwords.npz
+    :param cache_dir: The folder of the memoized hashes
+    :return synonym_subs: See Subword_Embedding.segment_synonyms
+    :return rerank_subs: See Subword_Embedding.segment_synonyms
+    """
+    key = artifact_key(inputs=inputs, cache_dir=cache_dir)
+
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as artifact:
+            if str(artifact['key']) == key:
+                print('Load the sub-words of standard and synonym terms from', path)
+                synonym_subs = [json.loads(i) for i in artifact['synonym_subs'].tolist()]
+                rerank_subs = artifact['rerank_subs'].tolist()
+                return synonym_subs, rerank_subs
+
+    synonym_subs, rerank_subs = subword_embed.segment_synonyms()
+
+    def save_func(temp_path):
+        with open(temp_path, 'wb') as fp:
+            np.savez(fp, key=np.array(key),
+                     synonym_subs=np.array([json.dumps(i, ensure_ascii=False) for i in synonym_subs], dtype=str),
+                     rerank_subs=np.array(rerank_subs, dtype=str))
+    save_atomic(path=path, save_func=save_func)
+    return synonym_subs, rerank_subs
+
+
+def load_standard_vector_cached(subword_embed, inputs: list, cache_dir='cache/', synonym_subs=None) -> tuple:
+    """
+    Load the word vectors of the standard and synonym terms from the cache,
+    compute and save them if the input files have changed
+    :param subword_embed: The Subword_Embedding class
+    :param inputs: The paths of the Knowledge Base, the sub-words list and the word vectors
+    :param cache_dir: The folder of the cache
+    :param synonym_subs: The precomputed sub-words of the terms, see Subword_Embedding.load_standard_vector
+    :return synonym_vec: See Subword_Embedding.load_standard_vector
+    :return synonym_term: See Subword_Embedding.load_standard_vector
+    """
+    key = artifact_key(inputs=inputs, cache_dir=cache_dir)
+    path = os.path.join(cache_dir, 'standard_vector-' + key[:16] + '.npz')
+
+    if os.path.exists(path):
+        print('Load the word vectors of standard and synonym terms from', path)
+        with np.load(path, allow_pickle=False) as artifact:
+            synonym_vec = np.ascontiguousarray(artifact['synonym_vec'])
+            synonym_term = artifact['synonym_term'].tolist()
+        return synonym_vec, synonym_term
+
+    synonym_vec, synonym_term = subword_embed.load_standard_vector(synonym_subs=synonym_subs)
+
+    def save_func(temp_path):
+        with open(temp_path, 'wb') as fp:
+            np.savez(fp, synonym_vec=synonym_vec, synonym_term=np.array(synonym_term, dtype=str))
+    os.makedirs(cache_dir, exist_ok=True)
+    save_atomic(path=path, save_func=save_func)
+    return synonym_vec, synonym_term
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from match_func import load_match, add_match_arguments
+from server import result_to_json
+from instrumentation import Metrics, JSON_Sink
+
+
+class Micro_Batcher:
+    """
+    Gather the input strings arriving within a short window, and map them with one Match.map_batch call,
+    so that the Cosine Similarity of the whole batch is one matrix-matrix product against synonym_vec
+    A batch is mapped once it owns max_batch input strings, or max_delay seconds after its first input string
+    """
+    def __init__(self, match_class, max_batch=64, max_delay=0.002):
+        """
+        :param match_class: The Match class
+        :param max_batch: Maximum number of the input strings in a batch
+        :param max_delay: Maximum waiting time (seconds) of the first input string in a batch
+        """
+        self.match_class = match_class
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self.timer = None
+
+        # The batches are mapped one by one in a thread, so the event loop keeps accepting requests
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batch_num = 0
+        self.input_num = 0
+
+    async def map(self, input_str: str):
+        """
+        Map the input string to the standard term, with the other input strings of its batch
+        :param input_str: Input String
+        :return: Mapping_Result of the input string
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((input_str, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self):
+        """
+        Map the pending input strings as a batch, and resolve their futures when the batch is mapped
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch == []:
+            return
+        self.batch_num += 1
+        self.input_num += len(batch)
+
+        def resolve(task):
+            error = task.exception()
+            for index, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(task.result()[index])
+
+        input_strs = [input_str for input_str, _ in batch]
+        task = asyncio.get_running_loop().run_in_executor(self.executor, self.match_class.map_batch, input_strs)
+        task.add_done_callback(resolve)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class Bad_Request(ValueError):
+    """
+    A malformed HTTP request (request line or Content-Length), answered with 400 before the connection is closed
+    """
+
+
+async def read_request(reader) -> tuple:
+    """
+    Read an HTTP/1.1 request
+    :return method: The request method, None if the connection is closed
+    :return path: The request path
+    :return headers: The request headers (lower-case names)
+    :return body: The request body
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None, None, None, None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise Bad_Request('Malformed request line: {}'.format(request_line.decode('latin-1').strip()))
+    method, path, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    content_length = headers.get('content-length', '0')
+    if not content_length.isdigit():
+        raise Bad_Request('Invalid Content-Length: {}'.format(content_length))
+    body = await reader.readexactly(int(content_length))
+    return method, path, headers, body
+
+
+def make_response(status: int, data: dict, keep_alive: bool) -> bytes:
+    """
+    Make an HTTP/1.1 response with a JSON body
+    """
+    reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    head = ('HTTP/1.1 %s %s\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: %s\r\nConnection: %s\r\n\r\n'
+            % (status, reasons[status], len(body), 'keep-alive' if keep_alive else 'close'))
+    return head.encode('latin-1') + body
+
+
+async def handle_request(batcher: Micro_Batcher, method: str, path: str, body: bytes) -> tuple:
+    """
+    Handle a request, see server.Mapping_Handler for the endpoints
+    :return status: The response status
+    :return data: The response data
+    """
+    if method == 'GET' and path == '/health':
+        result_cache = batcher.match_class.result_cache
+        metrics = batcher.match_class.metrics
+        return 200, {'status': 'ok', 'batches': batcher.batch_num, 'inputs': batcher.input_num,
+                     'cache': None if result_cache is None else result_cache.stats(),
+                     'metrics': metrics.snapshot() if metrics.enabled else None}
+    if method != 'POST' or path not in ('/map', '/map_batch'):
+        return 404, {'error': 'Not found: ' + path}
+
+    try:
+        data = json.loads(body.decode('utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError('The request body should be a JSON object')
+        input_strs = [data['input']] if path == '/map' else data['inputs']
+        if not isinstance(input_strs, list) or not all(isinstance(i, str) for i in input_strs):
+            raise ValueError('The input(s) should be string(s)')
+    except (ValueError, KeyError) as error:
+        return 400, {'error': 'Bad request: ' + str(error)}
+
+    results = await asyncio.gather(*[batcher.map(input_str=input_str) for input_str in input_strs])
+    results = [result_to_json(input_str=i, result=j) for i, j in zip(input_strs, results)]
+    if path == '/map':
+        return 200, results[0]
+    return 200, {'results': results}
+
+
+def make_connection_handler(batcher: Micro_Batcher):
+    """
+    Get the handler of the client connections (keep-alive is supported)
+    """
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                method, path, headers, body = await read_request(reader)
+                if method is None:
+                    break
+                try:
+                    status, data = await handle_request(batcher=batcher, method=method, path=path, body=body)
+                except Exception as error:
+                    status, data = 500, {'error': repr(error)}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(make_response(status=status, data=data, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except Bad_Request as error:
+            # The rest of the connection can't be parsed, so it's closed after the response
+            writer.write(make_response(status=400, data={'error': 'Bad request: ' + str(error)}, keep_alive=False))
+            with contextlib.suppress(ConnectionError):
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    return handle_connection
+
+
+async def serve(match_class, host: str, port: int, max_batch: int, max_delay: float):
+    """
+    Serve the concept mapping with micro-batching until cancelled
+    """
+    batcher = Micro_Batcher(match_class=match_class, max_batch=max_batch, max_delay=max_delay)
+    server = await asyncio.start_server(make_connection_handler(batcher=batcher), host=host, port=port)
+    print('Serving the concept mapping on http://%s:%s' % server.sockets[0].getsockname()[:2])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.close()
+
+
+# The main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local HTTP service of the concept mapping, with micro-batching of the requests')
+    parser.add_argument('--host', default='127.0.0.1', help='The host to bind')
+    parser.add_argument('--port', type=int, default=8000, help='The port to bind')
+    parser.add_argument('--max_batch', type=int, default=64, help='Maximum number of the input strings in a batch')
+    parser.add_argument('--max_delay', type=float, default=2.0, help='Maximum waiting time (ms) of an input string before its batch is mapped')
+    add_match_arguments(parser=parser)
+    parser.add_argument('--metrics', action='store_true', help='Record the time of each stage and the counters, reported by GET /health')
+    parser.add_argument('--trace_path', default=None, help='The JSON lines file of the per-request traces (only with --metrics)')
+    args = parser.parse_args()
+
+    # The metrics are disabled by default
+    sink = JSON_Sink(path=args.trace_path) if args.trace_path is not None else None
+    metrics = Metrics(enabled=args.metrics, is_trace=sink is not None, sink=sink)
+
+    # Load the resources once, the mapping details are not printed
+    match_class = load_match(file_threshold=args.threshold, vector_path=args.vector_path, word_dim=args.word_dim, is_print=False,
+                             cache_size=args.cache_size, cache_path=args.cache_path, index_path=args.index_path, nprobe=args.nprobe,
+                             precision=args.precision, metrics=metrics)
+    try:
+        asyncio.run(serve(match_class=match_class, host=args.host, port=args.port,
+                          max_batch=args.max_batch, max_delay=args.max_delay / 1000))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if match_class.result_cache is not None:
+            match_class.result_cache.save()
+        if sink is not None:
+            sink.close()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import codecs
+import argparse
+import contextlib
+import subprocess
+import jieba
+from match_func import load_match, add_match_arguments
+from instrumentation import Metrics
+from prune_vector import reachable_vocabulary
+from vector_store import TEXT_FILE, word_vector_files
+from utility import *
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The stages of the mapping pipeline, timed by the metrics of the Match class (see instrumentation.py)
+# other: the time of Match.map out of the stages
+STAGES = ['normalization', 'fmm_bmm', 'dictionary_matching', 'jieba', 'embedding', 'cosine_scoring', 'rerank', 'other']
+
+
+def make_stand_in_vectors(path: str, terms: list, word_dim: int, max_len=4, seed=0) -> int:
+    """
+    Make small stand-in word vectors (word_vectors.vec), so that the benchmark runs without the pre-trained word vectors
+    The words are the N-grams of the terms, the vector of a word is the mean of random character vectors plus noise,
+    so that words sharing characters are similar
+    :param path: The folder of the word vectors
+    :param terms: The standard and synonym terms
+    :param word_dim: Dimension of the word vectors
+    :param max_len: The length of the longest word
+    :param seed: The random seed
+    :return: Number of the word vectors
+    """
+    random = np.random.RandomState(seed)
+    words = sorted(reachable_vocabulary(terms=terms, max_len=max_len))
+    char_vec = {}
+    for char in sorted(set(''.join(words))):
+        char_vec[char] = random.standard_normal(word_dim)
+
+    # The words of the text word vectors can't own spaces
+    words = [word for word in words if len(word.split()) == 1 and word.split()[0] == word]
+    os.makedirs(path, exist_ok=True)
+    with open(path + TEXT_FILE + '.tmp', 'w', encoding='utf-8', newline='\n') as fp:
+        for word in words:
+            vec = np.mean([char_vec[char] for char in word], axis=0) + 0.3 * random.standard_normal(word_dim)
+            fp.write(word + ' ' + ' '.join('%.5f' % x for x in vec) + '\n')
+    os.replace(path + TEXT_FILE + '.tmp', path + TEXT_FILE)
+    return len(words)
+
+
+def noisy_variant(term: str, random: np.random.RandomState) -> str:
+    """
+    Get a noisy variant of a term: a character dropped, two characters swapped, a punctuation or space inserted,
+    or the case of the English changed
+    """
+    if len(term) < 2:
+        return term
+    i = random.randint(len(term) - 1)
+    noise = random.randint(4)
+    if noise == 0:
+        return term[:i] + term[i + 1:]
+    if noise == 1:
+        return term[:i] + term[i + 1] + term[i] + term[i + 2:]
+    if noise == 2:
+        return term[:i] + random.choice(['（', '）', '-', ' ', '，', '/']) + term[i:]
+    return term.swapcase()
+
+
+def make_corpus(terms: list, size: int, noise_ratio: float, seed=0) -> list:
+    """
+    Get the benchmark corpus: synonym terms, and noisy variants of synonym terms
+    :param terms: The synonym terms
+    :param size: Number of the input strings
+    :param noise_ratio: Ratio of the noisy variants
+    :param seed: The random seed
+    :return: The input strings
+    """
+    random = np.random.RandomState(seed)
+    corpus = [str(terms[i]) for i in random.choice(len(terms), size=size, replace=size > len(terms))]
+    for i in random.choice(size, size=int(size * noise_ratio), replace=False):
+        corpus[i] = noisy_variant(term=corpus[i], random=random)
+    return corpus
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size (MB) of the process, None if it's not supported
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit():
+    """
+    Get the current commit, None if it's not a git repository
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_stats(latency: list) -> dict:
+    """
+    Get the percentiles (ms) of the latencies (seconds)
+    """
+    latency = np.array(latency) * 1000
+    return {'mean': float(np.mean(latency)), 'p50': float(np.percentile(latency, 50)), 'p95': float(np.percentile(latency, 95)),
+            'p99': float(np.percentile(latency, 99)), 'max': float(np.max(latency))}
+
+
+def run_single(match_class, corpus: list) -> dict:
+    """
+    Map the input strings one by one (Match.map)
+    """
+    match_class.subword_embed_calss.memo_embedding.cache_clear()
+    latency = []
+    start = time.perf_counter()
+    for input_str in corpus:
+        map_start = time.perf_counter()
+        match_class.map(input_str=input_str)
+        latency.append(time.perf_counter() - map_start)
+    total = time.perf_counter() - start
+    return {'inputs': len(corpus), 'seconds': total, 'throughput': len(corpus) / total, 'latency_ms': latency_stats(latency=latency)}
+
+
+def run_batch(match_class, corpus: list, batch_size: int) -> dict:
+    """
+    Map the input strings batch by batch (Match.map_batch), the latency is the one of a batch
+    """
+    match_class.subword_embed_calss.memo_embedding.cache_clear()
+    latency = []
+    start = time.perf_counter()
+    for batch_start in range(0, len(corpus), batch_size):
+        map_start = time.perf_counter()
+        match_class.map_batch(input_strs=corpus[batch_start:batch_start + batch_size], batch_size=batch_size)
+        latency.append(time.perf_counter() - map_start)
+    total = time.perf_counter() - start
+    return {'inputs': len(corpus), 'batch_size': batch_size, 'seconds': total, 'throughput': len(corpus) / total,
+            'batch_latency_ms': latency_stats(latency=latency)}
+
+
+def run_stages(match_class, corpus: list) -> tuple:
+    """
+    Map the input strings one by one with the metrics enabled, in another pass so that the timers don't affect the latency
+    :return stages: The time (ms) per input string, the share and the number of calls of each stage
+    :return counters: The counters of the metrics (look-ups, OOV look-ups, ...)
+    """
+    match_class.subword_embed_calss.memo_embedding.cache_clear()
+    metrics = match_class.metrics
+    metrics.reset()
+    metrics.enabled = True
+    try:
+        for input_str in corpus:
+            match_class.map(input_str=input_str)
+    finally:
+        metrics.enabled = False
+    snapshot = metrics.snapshot()
+
+    # The exclusive time of Match.map is the time out of the stages
+    timers = snapshot['timers']
+    timers['other'] = timers.pop('map')
+    total = sum(timer['seconds'] for timer in timers.values())
+    stages = dict((stage, {'ms_per_input': 1000 * timers[stage]['seconds'] / len(corpus) if stage in timers else 0.0,
+                           'share': timers[stage]['seconds'] / total if stage in timers else 0.0,
+                           'calls': timers[stage]['calls'] if stage in timers else 0}) for stage in STAGES)
+    return stages, snapshot['counters']
+
+
+# The main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the mapping pipeline, the results are printed as JSON')
+    add_match_arguments(parser=parser, is_cache=False)
+    parser.add_argument('--stand_in', action='store_true',
+                        help='Use the stand-in word vectors (made in cache/stand_in_vectors/ if missing) instead of --vector_path')
+    parser.add_argument('--size', type=int, default=2000, help='Number of the input strings')
+    parser.add_argument('--noise_ratio', type=float, default=0.5, help='Ratio of the noisy variants of the synonym terms')
+    parser.add_argument('--batch_size', type=int, default=256, help='Batch size of Match.map_batch, 0 to skip the batch benchmark')
+    parser.add_argument('--no_stages', action='store_true', help='Skip the per-stage timings')
+    parser.add_argument('--seed', type=int, default=0, help='The random seed of the corpus')
+    parser.add_argument('--output', default=None, help='The JSON file of the results, only printed if it is not given')
+    args = parser.parse_args()
+
+    knowledge = read_csv(path_txt='pre_words_dict-' + args.threshold + '.csv')
+    vector_path = args.vector_path
+    if args.stand_in:
+        vector_path = 'cache/stand_in_vectors/'
+        if not os.path.exists(word_vector_files(path=vector_path)[0]):
+            rows = make_stand_in_vectors(path=vector_path, terms=np.concatenate([knowledge[:, 0], knowledge[:, 1]]),
+                                         word_dim=args.word_dim)
+            print('Made', rows, 'stand-in word vectors in', vector_path, file=sys.stderr)
+
+    # The mapping details are not printed, and the mapping results are not cached
+    # The loading messages go to stderr, so that stdout is the JSON only
+    load_start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        match_class = load_match(file_threshold=args.threshold, vector_path=vector_path, word_dim=args.word_dim, is_print=False,
+                                 index_path=args.index_path, nprobe=args.nprobe, precision=args.precision, metrics=Metrics())
+        # Jieba loads its dictionary on the first call, it's not counted in the latency
+        jieba.initialize()
+    load_time = time.perf_counter() - load_start
+
+    corpus = make_corpus(terms=knowledge[:, 1], size=args.size, noise_ratio=args.noise_ratio, seed=args.seed)
+    results = {'commit': git_commit(),
+               'config': {'threshold': args.threshold, 'vector_path': vector_path, 'size': args.size, 'noise_ratio': args.noise_ratio,
+                          'precision': args.precision, 'index_path': args.index_path, 'nprobe': args.nprobe, 'seed': args.seed},
+               'load_seconds': load_time,
+               'single': run_single(match_class=match_class, corpus=corpus)}
+    if args.batch_size > 0:
+        results['batch'] = run_batch(match_class=match_class, corpus=corpus, batch_size=args.batch_size)
+    if not args.no_stages:
+        results['stages'], results['counters'] = run_stages(match_class=match_class, corpus=corpus)
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        with codecs.open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(output + '\n')
+    print(output)
@@ -2,136 +2,103 @@
 # -*- coding: utf-8 -*-
 
 from utility import *
-from subword_embedding import Subword_Embedding
-from match_func import Match
+from match_func import load_match
+from search_index import Quantized_Index
+import multiprocessing
+import argparse
+import os
+
+
+def evaluate_rows(rows: list) -> list:
+    """
+    Evaluate the standard and synonym terms of the rows
+    The loaded resources are the globals of the main function,
+    and they are shared read-only by the worker processes through fork (copy-on-write)
+    :param rows: The rows of the Knowledge Base
+    :return results: [row, input string, mapped standard term, right or not] w.r.t. each row
+    """
+    results = []
+    for k in rows:
+        input_str = standard_synonym[k]
+
+        #################--FIND STANDARD TERM--####################################################
+        # Map the input string [Sub-words -> Standard Terms -> Final Mapping]
+        final_output = match_class.map(input_str=input_str).standard_term
+
+        # Calculate Model Accuracy
+        is_right = final_output == standard_terms[k]
+        match_class.log_info(event='evaluation', input=input_str, mapping=final_output, right=is_right)
+        results.append([k, input_str, final_output, is_right])
+    return results
+
+
+def evaluate_all(data_num: int, workers: int) -> list:
+    """
+    Evaluate all the rows of the Knowledge Base, in the worker processes if workers > 1
+    :param data_num: Number of the rows
+    :param workers: Number of the worker processes
+    :return results: See evaluate_rows()
+    """
+    if workers == 1:
+        return evaluate_rows(rows=range(data_num))
+
+    # Split the rows into contiguous chunks, and merge the results in order
+    chunks = [chunk.tolist() for chunk in np.array_split(np.arange(data_num), workers * 4) if len(chunk) != 0]
+    with multiprocessing.get_context('fork').Pool(processes=workers) as pool:
+        return [result for chunk_results in pool.imap(evaluate_rows, chunks) for result in chunk_results]
 
 
 # The main function
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate the Concept Mapping on the standard and synonym terms')
+    parser.add_argument('--precisions', default='',
+                        help='Comma-separated reduced precisions of the synonym matrix to evaluate as well (float16,int8), '
+                             'their accuracy deltas are w.r.t. float32, each one is a full evaluation')
+    args = parser.parse_args()
+
     ########################--LOAD standard-DEFINED DICT--##################################################
     # Get the standard terms, synonym terms, and terms' sub-words
     file_threshold = '200'
-    knowledge = read_csv(path_txt='pre_words_dict-' + file_threshold + '.csv')
-    standard_terms, standard_synonym = knowledge[:, 0], knowledge[:, 1]
-    print('There are', np.shape(standard_synonym)[0], 'standard and synonym terms!')
 
-    # Get the sub-words list
-    subword_list = read_csv(path_txt='subwords_freq_' + file_threshold + '.csv')
-    subword_list = subword_list[:, 1]
+    # The reduced precisions of the synonym matrix to be evaluated (opt-in)
+    precisions = [precision for precision in args.precisions.split(',') if precision != '']
+    for precision in precisions:
+        if precision not in ('float16', 'int8'):
+            parser.error('Unknown precision: {}'.format(precision))
 
-    # Load standard-trained vectors and get word Embeddings of standard and synonym words
-    pre_trained = load_word_vector(path='data/', word_dim=128)
-    subword_embed = Subword_Embedding(sub_list=subword_list, pre_trained=pre_trained, standard_synonym=standard_synonym)
-    synonym_vec, synonym_term = subword_embed.load_standard_vector()
-    print('There are', np.shape(synonym_term)[0], 'standard and synonym terms that own word vectors!')
+    # Number of the worker processes (fork is needed to share the resources)
+    workers = os.cpu_count() or 1
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        workers = 1
 
-    print('Start to evaluate.....................')
-    score = 0
-    for k in range(np.shape(standard_synonym)[0]):
-        input_str = standard_synonym[k]
-        print('The input string is ', input_str)
-
-        # Load Match Class
-        match_class = Match(input_str=input_str,
-                            knowledge=knowledge,
-                            standard_terms=standard_terms,
-                            standard_synonym=standard_synonym,
-                            sub_list=subword_list,
-                            pre_trained=pre_trained,
-                            synonym_vec=synonym_vec,
-                            synonym_term=synonym_term)
+    # Load the resources and the Match Class, built once and reused for every input string
+    match_class = load_match(file_threshold=file_threshold)
+    standard_terms, standard_synonym = match_class.standard_terms, match_class.standard_synonym
 
-        #################--FIND STANDARD TERM--####################################################
-        # Get all the mapping w.r.t. standard terms
-        temp_str = remove_punctuation(term=input_str)
-        temp_str = temp_str.replace(temp_str, temp_str.lower())  # Use lowercase if there is English
-
-        # Find and remove English from term
-        re_eng, eng_subword = find_English_term(term=temp_str)
-
-        #####################--GET SUB-WORDS--#########################################################
-        input_subword = subword_embed.get_subword(term=re_eng, is_print=False)
-
-        # Combine the sub-words with the removed English term(s)
-        subwords = match_class.eng_with_sub(eng=eng_subword, subword=input_subword)
-        print('All the sub-words are', subwords)
-
-        matched = []
-        matched_loc = []
-        for i in subwords:
-            # This sub-word is in the standard terms
-            if i in standard_terms and len(i) > 1:
-                print(i, '----->', i)
-                matched.append(i)
-
-                try:
-                    start_loc = temp_str.index(i)
-                    end_loc = start_loc + len(i)
-                    matched_loc.append([start_loc, end_loc])
-                except ValueError:
-                    print('{} not found in the search space.'.format(i))
-                    continue
-
-            # This sub-word is in the synonym terms
-            elif i in standard_synonym and len(i) > 1:
-                s_index = standard_synonym.tolist().index(i)
-                print(i, '----->', knowledge[s_index, 0])
-                matched.append(knowledge[s_index, 0])
-
-                try:
-                    start_loc = temp_str.index(i)
-                    end_loc = start_loc + len(i)
-                    matched_loc.append([start_loc, end_loc])
-                except ValueError:
-                    print('{} not found in the search space.'.format(i))
-                    continue
-
-            # other non-matched sub-word
-            else:
-                print(i, '----->', False)
-
-        #################--FIND THE NON-MATCHED term--###################################################
-        # Get the Non-matched sub-words
-        non_match = match_class.non_match_word(matched_loc=matched_loc)
-        input_jieba = jieba.lcut(re_eng, HMM=True)
-
-        # If there was no non-matched sub-words
-        if non_match == []:
-            # One Matched Standard Term
-            if len(matched) == 1:
-                print('Final Mapping ::: ', input_str, '----->', matched[0])
-                final_output = matched[0]
-            # Multiple Matched Standard Terms
-            else:
-                out_standard = list(set(matched + subwords + input_jieba))
-                final_output = match_class.final_mapping(all_standard=out_standard)
-        # If there were non-matched sub-words
-        else:
-            print('The None-matched sub-words are ', non_match, '\n', '-' * 100)
-
-            # Sub-words mapped to standard term
-            # out_standard = match_class.subword_mapping(non_match=non_match)
-
-            # out_standard: The Standard term mapped by the Non-matched sub-word
-            # matched: Matched Standard Term of the sub-word
-            # non_match: The Non-matched sub-word
-            # subwords: The sub-words of the input string
-            # input_str: The input string
-            input_jieba = jieba.lcut(re_eng, HMM=True)
-            out_standard = list(set(matched + non_match + subwords + input_jieba))
-            print('All the sub-words\' mapped standard terms: ', out_standard)
-
-            # [Final] standard term Mapping
-            final_output = match_class.final_mapping(all_standard=out_standard)
+    # The mapping details are printed only by a single process
+    match_class.is_print = workers == 1
 
-        # Calculate Model Accuracy
-        if final_output == standard_terms[k]:
-            print('Yes')
-            score += 1
-        else:
-            print('No')
+    print('Start to evaluate.....................')
+    data_num = np.shape(standard_synonym)[0]
+    results = evaluate_all(data_num=data_num, workers=workers)
+
+    # Save the per-item results
+    results_path = 'evaluate_results-' + file_threshold + '.csv'
+    pd.DataFrame(results).to_csv(results_path, sep=',', index=False, header=['row', 'input', 'mapping', 'right'])
+    print('The per-item results have been saved to', results_path)
 
+    score = sum([result[3] for result in results])
     print('Cheers! ', score, 'terms got right!')
-    data_num = np.shape(standard_synonym)[0]
     acc = score / data_num
     print('Model Accuracy is ', acc)
+
+    # Evaluate the reduced-precision synonym matrices, only the Cosine Similarity changes
+    synonym_vec = match_class.synonym_vec
+    match_class.is_print = False
+    for precision in precisions:
+        match_class.search_index = Quantized_Index(synonym_vec=synonym_vec, precision=precision)
+        precision_results = evaluate_all(data_num=data_num, workers=workers)
+        precision_acc = sum([result[3] for result in precision_results]) / data_num
+        changed = sum([i[2] != j[2] for i, j in zip(results, precision_results)])
+        print('Model Accuracy (%s synonym matrix, %.1f MB) is %s, delta: %+.6f, %s mappings changed'
+              % (precision, match_class.search_index.synonym_vec.nbytes / 2 ** 20, precision_acc, precision_acc - acc, changed))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import json
+import time
+import threading
+import collections
+
+
+def format_record(record: dict) -> str:
+    """
+    Format a record as a human-readable line: event: key=value, ...
+    """
+    fields = ', '.join('%s=%s' % (key, value) for key, value in record.items() if key not in ('event', 'time'))
+    return '%s: %s' % (record['event'], fields)
+
+
+class Console_Sink:
+    """
+    Print the records as human-readable lines
+    """
+    def __init__(self, stream=None):
+        """
+        :param stream: The output stream, sys.stdout if it's None
+        """
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def emit(self, record: dict):
+        with self.lock:
+            print(format_record(record=record), file=self.stream or sys.stdout)
+
+    def close(self):
+        pass
+
+
+class JSON_Sink:
+    """
+    Write the records as JSON lines, to be aggregated by other tools
+    """
+    def __init__(self, path=None, stream=None):
+        """
+        :param path: The file of the records (appended), stream is used if it's None
+        :param stream: The output stream, sys.stderr if both are None
+        """
+        self.fp = open(path, 'a', encoding='utf-8') if path is not None else None
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def emit(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            stream = self.fp or self.stream or sys.stderr
+            stream.write(line + '\n')
+            stream.flush()
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+
+
+class Null_Span:
+    """
+    The timer and the trace of the disabled metrics, they do nothing
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = Null_Span()
+
+
+class Span:
+    """
+    Timer of a stage, the time of its nested stages is not counted in it (exclusive time),
+    so that the stages of a mapping add up to its latency
+    """
+    __slots__ = ('metrics', 'stage', 'start', 'nested')
+
+    def __init__(self, metrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.nested = 0.0
+
+    def __enter__(self):
+        self.metrics.local_state().stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        state = self.metrics.local_state()
+        state.stack.pop()
+        if state.stack != []:
+            state.stack[-1].nested += elapsed
+        self.metrics.add_time(stage=self.stage, seconds=elapsed - self.nested)
+
+        # The span of the request being traced (inclusive time)
+        if state.trace is not None:
+            state.trace.append({'stage': self.stage, 'start_ms': round(1000 * (self.start - state.trace_start), 3),
+                                'ms': round(1000 * elapsed, 3)})
+        return False
+
+
+class Trace:
+    """
+    Trace of a request: the spans of its stages are logged as one record when the request is done
+    A trace inside another trace (of the same thread) is merged into the outer one
+    """
+    def __init__(self, metrics, request: str):
+        self.metrics = metrics
+        self.request = request
+        self.is_outer = False
+
+    def __enter__(self):
+        state = self.metrics.local_state()
+        if state.trace is None:
+            self.is_outer = True
+            state.trace = []
+            state.trace_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.is_outer:
+            return False
+        state = self.metrics.local_state()
+        spans, state.trace = state.trace, None
+        self.metrics.log(event='trace', request=self.request, ms=round(1000 * (time.perf_counter() - state.trace_start), 3), spans=spans,
+                         error=None if exc_info[0] is None else repr(exc_info[1]))
+        return False
+
+
+class Metrics:
+    """
+    Lightweight instrumentation of the mapping pipeline: timers of the stages, counters, and optional per-request traces
+    Disabled by default, a disabled timer or trace is a shared no-op object, and a disabled counter returns at once
+    The records (traces, and optionally the mapping details) are sent to the sink, if there is one
+    The Metrics class is shared by the threads, the timer stacks and the traces are per thread
+    """
+    def __init__(self, enabled=False, is_trace=False, sink=None, is_detail=False):
+        """
+        :param enabled: Whether to record the timers and the counters
+        :param is_trace: Whether to log a trace of every request (only if enabled)
+        :param sink: The sink of the records (Console_Sink or JSON_Sink), not logged if it's None
+        :param is_detail: Whether to log the mapping details (see Match.log_info), many records per request
+        """
+        self.enabled = enabled
+        self.is_trace = is_trace
+        self.sink = sink
+        self.is_detail = is_detail
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.times = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.counters = collections.defaultdict(int)
+
+    def local_state(self):
+        """
+        Get the timer stack and the trace of the current thread
+        """
+        state = self.local
+        if not hasattr(state, 'stack'):
+            state.stack = []
+            state.trace = None
+            state.trace_start = 0.0
+        return state
+
+    def timer(self, stage: str):
+        """
+        Time a stage: with metrics.timer(stage='embedding'): ...
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(metrics=self, stage=stage)
+
+    def trace(self, request: str):
+        """
+        Trace a request: with metrics.trace(request=input_str): ...
+        """
+        if not (self.enabled and self.is_trace):
+            return NULL_SPAN
+        return Trace(metrics=self, request=request)
+
+    def count(self, name: str, value=1):
+        """
+        Add the value to a counter
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += value
+
+    def add_time(self, stage: str, seconds: float):
+        with self.lock:
+            self.times[stage] += seconds
+            self.calls[stage] += 1
+
+    def log(self, event: str, **fields):
+        """
+        Log a record to the sink
+        """
+        if self.sink is None:
+            return
+        record = {'event': event, 'time': time.time()}
+        record.update(fields)
+        self.sink.emit(record)
+
+    def snapshot(self) -> dict:
+        """
+        Get the timers and the counters
+        :return: {'timers': {stage: {'calls', 'seconds', 'mean_ms', 'share'}}, 'counters': {name: value}}
+        """
+        with self.lock:
+            total = sum(self.times.values())
+            timers = dict((stage, {'calls': self.calls[stage], 'seconds': seconds, 'mean_ms': 1000 * seconds / self.calls[stage],
+                                   'share': seconds / total if total != 0 else 0.0})
+                          for stage, seconds in self.times.items())
+            return {'timers': timers, 'counters': dict(self.counters)}
+
+    def reset(self):
+        with self.lock:
+            self.times.clear()
+            self.calls.clear()
+            self.counters.clear()
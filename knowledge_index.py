@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+
+class Knowledge_Index:
+    """
+    Hash Index of the Knowledge Base (pre_words_dict-*.csv)
+    Map a synonym term to its row and standard term,
+    and map a standard term to its synonym terms (built on the first look-up)
+    The precomputed sub-words of the synonym terms are kept w.r.t. the rows, if they are given
+    """
+    def __init__(self, knowledge: np.array, rerank_subs=None):
+        """
+        :param knowledge: Knowledge Graph, [standard term, synonym term] per row
+        :param rerank_subs: The space-joined sub-words of the synonym term of each row, see Subword_Embedding.segment_synonyms
+        """
+        self.knowledge = knowledge
+        self.rerank_subs = rerank_subs
+        self.standard_terms = knowledge[:, 0]
+        self.standard_synonym = knowledge[:, 1]
+
+        self.standard_set = set(self.standard_terms)
+        self.synonym_row = {}
+        for row, synonym in enumerate(self.standard_synonym):
+            # Keep the first row of a repeated synonym term, as list.index() does
+            self.synonym_row.setdefault(synonym, row)
+
+        # standard term -> synonym terms, only built if it's looked up, it's not used by the mapping
+        self.standard_to_synonyms = None
+
+    def is_standard(self, term: str) -> bool:
+        """
+        Whether the term is a standard term
+        """
+        return term in self.standard_set
+
+    def is_synonym(self, term: str) -> bool:
+        """
+        Whether the term is a synonym term (might include standard terms)
+        """
+        return term in self.synonym_row
+
+    def get_row(self, synonym: str) -> int:
+        """
+        Get the row of the synonym term in the Knowledge Base
+        :param synonym: The synonym term
+        :return row: The (first) row of the synonym term
+        """
+        return self.synonym_row[synonym]
+
+    def get_standard(self, synonym: str) -> str:
+        """
+        Get the standard term of the synonym term
+        """
+        return self.standard_terms[self.synonym_row[synonym]]
+
+    def get_synonyms(self, standard: str) -> set:
+        """
+        Get all the synonym terms of the standard term
+        """
+        if self.standard_to_synonyms is None:
+            standard_to_synonyms = {}
+            for standard_term, synonym in zip(self.standard_terms, self.standard_synonym):
+                standard_to_synonyms.setdefault(standard_term, set()).add(synonym)
+            self.standard_to_synonyms = standard_to_synonyms
+        return self.standard_to_synonyms.get(standard, set())
+
+    def get_rerank_sub(self, row: int):
+        """
+        Get the precomputed space-joined sub-words of the synonym term of the row
+        :return: The sub-words, None if they were not precomputed
+        """
+        if self.rerank_subs is None:
+            return None
+        return self.rerank_subs[row]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import csv
+import json
+import argparse
+import itertools
+import collections
+import multiprocessing
+from match_func import load_match, add_match_arguments
+from server import result_to_json
+
+# The Match class of the worker processes, shared through fork
+match_class = None
+
+
+def read_inputs(path: str, column=None, field=None, has_header=False):
+    """
+    Stream the input strings of a CSV column or a JSONL field
+    A line without the value (a short CSV row, a JSONL line without the field, with a null or non-string value,
+    or not a JSON object) is mapped as '', and a blank line as well,
+    so that the outputs stay aligned with the lines, and the number of such lines is printed at the end
+    :param path: The path of the input file
+    :param column: The CSV column, an index, or a name if has_header is True
+    :param field: The JSONL field
+    :param has_header: Whether the CSV file has a header
+    :return: The generator of the input strings
+    """
+    missing = 0
+    with open(path, 'r', encoding='utf-8', newline='') as fp:
+        if field is not None:
+            for line in fp:
+                # A blank line is an empty input string, as an empty CSV row is
+                if not line.strip():
+                    yield ''
+                    continue
+                try:
+                    value = json.loads(line)[field]
+                except (ValueError, KeyError, TypeError, IndexError):
+                    value = None
+
+                # A null or non-string value is a missing value, it is not stringified
+                if isinstance(value, str):
+                    yield value
+                else:
+                    missing += 1
+                    yield ''
+        else:
+            reader = csv.reader(fp)
+            index = column
+            if has_header:
+                header = next(reader, [])
+                index = header.index(column) if column in header else int(column)
+            index = int(index)
+            for row in reader:
+                if index < len(row):
+                    yield row[index]
+                else:
+                    # An empty row is an empty input string, a short row is a missing value
+                    missing += 1 if row else 0
+                    yield ''
+    if missing != 0:
+        print(missing, 'lines of', path, 'have no input string, they are mapped as empty strings')
+
+
+def map_chunk(input_strs: list) -> list:
+    """
+    Map a chunk of the input strings in a worker process
+    :return: The results as dictionaries, see server.result_to_json
+    """
+    results = match_class.map_batch(input_strs=input_strs)
+    return [result_to_json(input_str=i, result=j) for i, j in zip(input_strs, results)]
+
+
+def format_results(results: list, is_jsonl: bool) -> str:
+    """
+    Format the results as JSONL lines or CSV rows (input, standard_term, candidates, scores)
+    """
+    if is_jsonl:
+        return ''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results)
+    lines = []
+    for result in results:
+        row = [result['input'], '' if result['standard_term'] is None else result['standard_term'],
+               '|'.join(result['candidates']), '|'.join('%.6f' % i for i in result['scores'])]
+        lines.append(','.join(csv_field(i) for i in row) + '\n')
+    return ''.join(lines)
+
+
+def csv_field(value: str) -> str:
+    """
+    Quote a CSV field if it's needed
+    """
+    if any(i in value for i in (',', '"', '\n', '\r')):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def input_signature(path: str) -> dict:
+    """
+    Get the signature of the input file (absolute path, size and mtime), to check that a checkpoint belongs to it
+    """
+    return {'path': os.path.abspath(path), 'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+
+
+def read_checkpoint(path: str) -> dict:
+    """
+    Read the checkpoint: the number of the mapped input strings, the size of the output file after them,
+    and the signature of the input file
+    """
+    if not os.path.exists(path):
+        return {'inputs': 0, 'offset': 0}
+    with open(path, 'r', encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    """
+    Save the checkpoint through a temporary file
+    """
+    with open(path + '.tmp', 'w', encoding='utf-8') as fp:
+        json.dump(checkpoint, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def map_file(input_strs, output_path: str, chunk_size=1000, workers=1, is_resume=True, input_path=None) -> int:
+    """
+    Map a stream of input strings chunk by chunk, and append the results to the output file
+    At most workers * 2 chunks are in flight, so the memory is bounded whatever the input size is
+    After every chunk, the output is flushed and the checkpoint (<output>.checkpoint) is saved,
+    so an interrupted run continues from the last saved chunk
+    :param input_strs: The iterable of the input strings
+    :param output_path: The path of the output file, JSONL if it ends with .jsonl, otherwise CSV
+    :param chunk_size: Number of the input strings in a chunk
+    :param workers: Number of the worker processes (fork is needed to share the resources)
+    :param is_resume: Whether to continue from the checkpoint
+    :param input_path: The input file of the input strings, a checkpoint of another input file (or of a modified one) is refused
+    :return: Number of the mapped input strings (including those mapped before resuming)
+    """
+    is_jsonl = output_path.endswith('.jsonl')
+    checkpoint_path = output_path + '.checkpoint'
+    signature = input_signature(path=input_path) if input_path is not None else None
+    checkpoint = read_checkpoint(path=checkpoint_path) if is_resume else {'inputs': 0, 'offset': 0}
+    if checkpoint['inputs'] != 0:
+        if checkpoint.get('source') != signature:
+            raise ValueError('The checkpoint {} belongs to another or a modified input file ({}), please map with --restart'
+                             .format(checkpoint_path, checkpoint.get('source')))
+        print('Resume from the checkpoint:', checkpoint['inputs'], 'input strings have been mapped')
+    checkpoint['source'] = signature
+
+    # Skip the mapped input strings, and drop the output written after the checkpoint
+    input_strs = iter(input_strs)
+    collections.deque(itertools.islice(input_strs, checkpoint['inputs']), maxlen=0)
+    chunks = iter(lambda: list(itertools.islice(input_strs, chunk_size)), [])
+
+    with open(output_path, 'ab') as fp:
+        fp.truncate(checkpoint['offset'])
+        if checkpoint['offset'] == 0 and not is_jsonl:
+            fp.write('input,standard_term,candidates,scores\n'.encode('utf-8'))
+
+        def write_chunk(results):
+            fp.write(format_results(results=results, is_jsonl=is_jsonl).encode('utf-8'))
+            fp.flush()
+            os.fsync(fp.fileno())
+            checkpoint['inputs'] += len(results)
+            checkpoint['offset'] = fp.tell()
+            save_checkpoint(path=checkpoint_path, checkpoint=checkpoint)
+            print(checkpoint['inputs'], 'input strings have been mapped')
+
+        if workers == 1:
+            for chunk in chunks:
+                write_chunk(results=map_chunk(input_strs=chunk))
+        else:
+            with multiprocessing.get_context('fork').Pool(processes=workers) as pool:
+                in_flight = collections.deque()
+                for chunk in chunks:
+                    in_flight.append(pool.apply_async(map_chunk, (chunk,)))
+                    if len(in_flight) >= workers * 2:
+                        write_chunk(results=in_flight.popleft().get())
+                while in_flight:
+                    write_chunk(results=in_flight.popleft().get())
+    return checkpoint['inputs']
+
+
+# The main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Map the input strings of a large CSV or JSONL file, in a streaming way')
+    parser.add_argument('--input', required=True, help='The input file, CSV or JSONL')
+    parser.add_argument('--output', required=True, help='The output file, JSONL if it ends with .jsonl, otherwise CSV')
+    parser.add_argument('--column', default='0', help='The CSV column of the input strings, an index or a name (with --header)')
+    parser.add_argument('--header', action='store_true', help='The CSV file has a header')
+    parser.add_argument('--field', default=None, help='The JSONL field of the input strings, the input is read as JSONL if it is given')
+    parser.add_argument('--chunk_size', type=int, default=1000, help='Number of the input strings in a chunk')
+    parser.add_argument('--workers', type=int, default=1, help='Number of the worker processes')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and map from the beginning')
+    add_match_arguments(parser=parser)
+    args = parser.parse_args()
+
+    workers = args.workers
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        workers = 1
+
+    # Load the resources once (before the fork), the mapping details are not printed
+    match_class = load_match(file_threshold=args.threshold, vector_path=args.vector_path, word_dim=args.word_dim, is_print=False,
+                             cache_size=args.cache_size, cache_path=args.cache_path, index_path=args.index_path, nprobe=args.nprobe,
+                             precision=args.precision)
+
+    input_strs = read_inputs(path=args.input, column=args.column, field=args.field, has_header=args.header)
+    total = map_file(input_strs=input_strs, output_path=args.output, chunk_size=args.chunk_size, workers=workers,
+                     is_resume=not args.restart, input_path=args.input)
+    print('Done!', total, 'input strings have been mapped to', args.output)
+
+    # The results cached by the worker processes are not merged, so the cache is only persisted by a single process
+    if match_class.result_cache is not None and workers == 1:
+        print('Cache metrics:', match_class.result_cache.stats())
+        match_class.result_cache.save()
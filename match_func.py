@@ -1,32 +1,75 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import heapq
+import collections
 from subword_embedding import Subword_Embedding
+from knowledge_index import Knowledge_Index
+from artifact_cache import load_standard_vector_cached, load_segmentation_cached, artifact_key
+from result_cache import Result_Cache
+from search_index import Exact_Index, IVF_Index, Quantized_Index
+from vector_store import word_vector_files
+from instrumentation import Metrics, format_record
 from utility import *
 
+# The mapping of one input string
+# standard_term: the final standard term
+# candidates: the top k standard terms of the Final Mapping
+# scores: the similarities w.r.t. the candidates
+Mapping_Result = collections.namedtuple('Mapping_Result', ['standard_term', 'candidates', 'scores'])
+
 
 class Match:
-    def __init__(self, input_str, knowledge, standard_terms, standard_synonym, sub_list, pre_trained, synonym_vec, synonym_term):
+    """
+    Long-lived Mapping Engine
+    Built once from the loaded resources, and then map(input_str) for every input string
+    All the per-query state is local, so one Match class can serve concurrent requests
+    """
+    def __init__(self, knowledge, knowledge_index, standard_terms, standard_synonym, sub_list, pre_trained, synonym_vec, synonym_term,
+                 subword_embed=None, is_print=True, result_cache=None, search_index=None, metrics=None):
         """
-        :param input_str: Input String
         :param knowledge: Knowledge Graph
+        :param knowledge_index: Hash Index of the Knowledge Graph
         :param standard_terms: standard terms (Standard Terms)
         :param standard_synonym: standard terms and their Synonyms
         :param sub_list: Sub-words Frequency List
         :param pre_trained: standard-trained word vectors
-        :param synonym_vec: Word vectors of (standard terms and their Synonyms)
+        :param synonym_vec: L2-normalized word vectors of (standard terms and their Synonyms)
         :param synonym_term: standard terms and their Synonyms **that can be restandardsented by a vector**
+        :param subword_embed: A shared Subword_Embedding class, a new one is built if it's None
+        :param is_print: Whether to print the mapping details, otherwise they can be logged to the sink of the metrics (see log_info)
+        :param result_cache: A Result_Cache of the mapping results, not cached if it's None
+        :param search_index: The search backend over synonym_vec (see search_index.py), the exact search if it's None
+        :param metrics: The Metrics class of the timers, counters and traces (see instrumentation.py), disabled if it's None,
+                        it should be shared with subword_embed
         """
-        self.input_str = input_str
         self.knowledge = knowledge
+        self.knowledge_index = knowledge_index
         self.standard_terms = standard_terms
         self.standard_synonym = standard_synonym
         self.sub_list = sub_list
         self.pre_trained = pre_trained
         self.synonym_vec = synonym_vec
         self.synonym_term = synonym_term
-        self.subword_embed_calss = Subword_Embedding(sub_list=self.sub_list, pre_trained=self.pre_trained, standard_synonym=self.standard_synonym)
+        self.is_print = is_print
+        self.result_cache = result_cache
+        self.metrics = metrics if metrics is not None else Metrics()
+        if search_index is None:
+            search_index = Exact_Index(synonym_vec=self.synonym_vec)
+        self.search_index = search_index
+        if subword_embed is None:
+            subword_embed = Subword_Embedding(sub_list=self.sub_list, pre_trained=self.pre_trained, standard_synonym=self.standard_synonym,
+                                              metrics=self.metrics)
+        self.subword_embed_calss = subword_embed
+
+    def log_info(self, event: str, **fields):
+        """
+        Log a mapping detail as a record {'event', <fields>}:
+            printed if is_print is True, otherwise sent to the sink of the metrics if its is_detail is True
+        """
+        if self.is_print is True:
+            print(format_record(record=dict(event=event, **fields)))
+        elif self.metrics.is_detail is True:
+            self.metrics.log(event=event, **fields)
 
     def eng_with_sub(self, eng: list, subword: list) -> list:
         """
@@ -38,7 +81,7 @@ class Match:
         out = " ".join('%s' % id for id in subwords).split()
         return out
 
-    def non_match_word(self, matched_loc: list):
+    def non_match_word(self, input_str: str, matched_loc: list):
         """
         Get non-matched (False) sub-words
         """
@@ -47,30 +90,112 @@ class Match:
         end = 0
         for i in sort_com:
             start = i[0]
-            false_word = self.input_str[end:start]
+            false_word = input_str[end:start]
             end = i[1]
             subs.append(false_word)
-        subs.append(self.input_str[end:])
+        subs.append(input_str[end:])
         while '' in subs:
             subs.remove('')
         return subs
 
+    def get_all_standard(self, input_str: str) -> tuple:
+        """
+        Map the sub-words of the input string to the standard terms
+        :param input_str: Input String
+        :return final_output: The standard term if the input string is directly mapped, otherwise None
+        :return out_standard: The terms whose Embeddings are used in the Final Mapping
+        """
+        # Get all the mapping w.r.t. standard terms
+        with self.metrics.timer(stage='normalization'):
+            temp_str = remove_punctuation(term=input_str)
+            temp_str = temp_str.replace(temp_str, temp_str.lower())  # Use lowercase if there is English
+
+            # Find and remove English from term
+            re_eng, eng_subword = find_English_term(term=temp_str)
+
+        # Get sub-words, and combine the sub-words with the removed English term(s)
+        input_subword = self.subword_embed_calss.get_subword(term=re_eng, is_print=False)
+        with self.metrics.timer(stage='dictionary_matching'):
+            subwords = self.eng_with_sub(eng=eng_subword, subword=input_subword)
+            self.log_info(event='subwords', input=input_str, subwords=subwords)
+
+            # Get the mapping of each sub-word [Sub-word -> Standard Term]
+            matched = []
+            matched_loc = []
+            for i in subwords:
+                # This sub-word is in the standard terms
+                if self.knowledge_index.is_standard(term=i) and len(i) > 1:
+                    self.log_info(event='subword_mapping', subword=i, standard_term=i)
+                    matched.append(i)
+
+                    try:
+                        start_loc = temp_str.index(i)
+                        end_loc = start_loc + len(i)
+                        matched_loc.append([start_loc, end_loc])
+                    except ValueError:
+                        self.log_info(event='subword_not_found', subword=i)
+                        continue
+
+                # This sub-word is in the synonym terms
+                elif self.knowledge_index.is_synonym(term=i) and len(i) > 1:
+                    s_standard = self.knowledge_index.get_standard(synonym=i)
+                    self.log_info(event='subword_mapping', subword=i, standard_term=s_standard)
+                    matched.append(s_standard)
+
+                    try:
+                        start_loc = temp_str.index(i)
+                        end_loc = start_loc + len(i)
+                        matched_loc.append([start_loc, end_loc])
+                    except ValueError:
+                        self.log_info(event='subword_not_found', subword=i)
+                        continue
+
+                # other non-matched sub-word
+                else:
+                    self.log_info(event='subword_mapping', subword=i, standard_term=None)
+
+            # Get the Non-matched sub-words
+            non_match = self.non_match_word(input_str=input_str, matched_loc=matched_loc)
+        with self.metrics.timer(stage='jieba'):
+            input_jieba = jieba.lcut(re_eng, HMM=True)
+
+        # If there was no non-matched sub-words
+        if non_match == []:
+            # One Matched Standard Term
+            if len(matched) == 1:
+                self.metrics.count(name='direct_mappings')
+                self.log_info(event='final_mapping', input=input_str, standard_term=matched[0], direct=True)
+                return matched[0], matched
+
+            # Multiple Matched Standard Terms
+            out_standard = list(set(matched + subwords + input_jieba))
+
+        # If there were non-matched sub-words
+        else:
+            self.log_info(event='non_matched_subwords', input=input_str, subwords=non_match)
+
+            # out_standard: The Standard term mapped by the Non-matched sub-word
+            # matched: Matched Standard Term of the sub-word
+            # non_match: The Non-matched sub-word
+            # subwords: The sub-words of the input string
+            out_standard = list(set(matched + non_match + subwords + input_jieba))
+            self.log_info(event='mapped_terms', input=input_str, terms=out_standard)
+        return None, out_standard
+
     def match_score(self, main_str: list, pattern_str: list):
         """
-        Use string mapping algorithm (KMP algorithm) to obtain the matched scores
+        Use string mapping algorithm (Aho-Corasick algorithm) to obtain the matched scores
         :param main_str: the sub-word of the target word, e.g., '我爱中国' -> '我 爱 中国'
         :param pattern_str: the sub-words of the sub-words list
         :return total_score: the total scores list
         """
+        # Compile all the patterns once
+        automaton = AhoCorasick(patterns=pattern_str)
+
         total_score = []
         for mains in main_str:
-            score = 0
-            # One target sub-word sentence
-            for pattern in pattern_str:
-                # Use string mapping algorithm to get the scores
-                loc = kmp(m_str=mains, s_str=pattern)
-                if loc != -1:
-                    score += 1
+            # One target sub-word sentence, one point for each matched pattern
+            score = automaton.count(text=mains)
             total_score.append(score)
         return total_score
 
@@ -87,85 +212,95 @@ class Match:
                 index.append(i)
         return index
 
-    def top_k_result(self, score, k=1):
+    def top_k_result(self, input_str: str, rows, scores) -> tuple:
         """
-        Get the top K scores
+        Get the standard terms of the top K rows (see Exact_Index.search)
+        :param rows: The top K rows of synonym_vec
+        :param scores: The top K scores
+        :return candidates: The top K standard terms
+        :return candidate_sub: The sub-words of the top K synonym terms
+        :return top_k: The top K scores
         """
-        self.candidates = []
-        self.candidate_sub = []
-        self.top_k = heapq.nlargest(n=k, iterable=score)
+        candidates = []
+        candidate_sub = []
+        top_k = np.asarray(scores).tolist()
 
         # Iterate the Top k scores, print each score and standard term
-        for top_i in self.top_k:
-            max_index = score.index(top_i)
-
+        for max_index, top_i in zip(rows, top_k):
             # Find the synonym term (might include standard terms)
             match_standard = self.synonym_term[max_index]
 
             # Find the standard term
-            p_index = self.standard_synonym.tolist().index(match_standard)
+            p_index = self.knowledge_index.get_row(synonym=match_standard)
             synonym_term = self.knowledge[p_index, 1]
             standard_term = self.knowledge[p_index, 0]
 
-            # These lines of codes are mainly for Sub-words frequency
-            temp_pre_name = remove_punctuation(term=synonym_term)
-            temp_pre_name, _ = find_English_term(term=temp_pre_name)
-            synonym_term_sub = self.subword_embed_calss.get_subword(term=temp_pre_name, is_print=False)
-            synonym_term_sub = ' '.join(synonym_term_sub)
-            self.candidates.append(standard_term)
-            self.candidate_sub.append(synonym_term_sub)
+            # These lines of codes are mainly for Sub-words frequency (precomputed, unless it's not loaded)
+            synonym_term_sub = self.knowledge_index.get_rerank_sub(row=p_index)
+            if synonym_term_sub is None:
+                temp_pre_name = remove_punctuation(term=synonym_term)
+                temp_pre_name, _ = find_English_term(term=temp_pre_name)
+                synonym_term_sub = self.subword_embed_calss.get_subword(term=temp_pre_name, is_print=False)
+                synonym_term_sub = ' '.join(synonym_term_sub)
+            candidates.append(standard_term)
+            candidate_sub.append(synonym_term_sub)
 
-            print('Top 10 Mapping ::: ', self.input_str, '----->', synonym_term, '----->', standard_term, ' (Similarity: ', top_i, ')')
-        return standard_term
+            self.log_info(event='top_k_mapping', input=input_str, synonym_term=synonym_term, standard_term=standard_term, similarity=top_i)
+        return candidates, candidate_sub, top_k
 
-    def subword_frequency(self, input_sub):
+    def subword_frequency(self, input_str: str, input_sub: list, candidates: list, candidate_sub: list, top_k: list) -> str:
         # Find all the *sub-words frequency scores*
-        total_score = self.match_score(main_str=self.candidate_sub, pattern_str=input_sub)
-        print('-' * 100)
-        print('Total matched frequency: ', total_score)
+        total_score = self.match_score(main_str=candidate_sub, pattern_str=input_sub)
 
         # Get the maximum frequency scores
         maxscore = self.find_max_score(scores=total_score)
-        print('Max matched Frequency: ', maxscore)
+        self.log_info(event='subword_frequency', input=input_str, frequency=total_score, max_index=maxscore)
 
         # Output the Results of *maximum frequency scores*
         final_map = []
         final_score = []
         for k in maxscore:
-            final_map.append(self.candidates[k])
-            final_score.append(self.top_k[k])
+            final_map.append(candidates[k])
+            final_score.append(top_k[k])
         final_map = list(set(final_map))
-        print('Maximum Sub-words\' Frequency Mapping Results: ', final_map)
 
         # Output the Results of *max similarity* in the *maximum frequency score(s)*
         top_map = max(final_score)
-        top_index = self.top_k.index(top_map)
-        print('Model Final Mapping ::: ', self.input_str, '----->', self.candidates[top_index])
-        final_output = self.candidates[top_index]
+        top_index = top_k.index(top_map)
+        self.log_info(event='final_mapping', input=input_str, standard_term=candidates[top_index], max_frequency_terms=final_map)
+        final_output = candidates[top_index]
         return final_output
 
-    def find_standard_term(self, score: list, is_final=False):
+    def find_standard_term(self, input_str: str, rows, scores, is_final=False) -> Mapping_Result:
         """
         Find the standard term
         if is_final is True:
             find the top 5 maximum scores standard terms with regard to **
         else:
             find the maximum score standard term with regard to *Non-matched sub-word Embedding*
+        :param rows: The top rows of synonym_vec (top 5 if is_final is True, otherwise top 1)
+        :param scores: The scores of the top rows
         """
-        # If it's the Final Mapping
-        if is_final is True:
-            standard_term = self.top_k_result(score=score, k=5)
-            input_sub = self.subword_embed_calss.get_subword(term=self.input_str, is_print=False)
-            input_sub = ' '.join(input_sub).split()
-            final_output = self.subword_frequency(input_sub=input_sub)
-            return final_output
+        # No row was found (the approximate search might probe no row)
+        if len(rows) == 0:
+            return Mapping_Result(standard_term=None, candidates=[], scores=[])
 
-        # If it's the non-matched sub-words Mapping
-        else:
-            standard_term = self.top_k_result(score=score, k=1)
-            return standard_term
+        with self.metrics.timer(stage='rerank'):
+            # If it's the Final Mapping
+            if is_final is True:
+                candidates, candidate_sub, top_k = self.top_k_result(input_str=input_str, rows=rows, scores=scores)
+                input_sub = self.subword_embed_calss.get_subword(term=input_str, is_print=False)
+                input_sub = ' '.join(input_sub).split()
+                final_output = self.subword_frequency(input_str=input_str, input_sub=input_sub,
+                                                      candidates=candidates, candidate_sub=candidate_sub, top_k=top_k)
+                return Mapping_Result(standard_term=final_output, candidates=candidates, scores=top_k)
+
+            # If it's the non-matched sub-words Mapping
+            else:
+                candidates, _, top_k = self.top_k_result(input_str=input_str, rows=rows, scores=scores)
+                return Mapping_Result(standard_term=candidates[-1], candidates=candidates, scores=top_k)
 
-    def subword_mapping(self, non_match: list) -> tuple:
+    def subword_mapping(self, input_str: str, non_match: list) -> list:
         """
         Calculate Cosine Similarity and find the most similar [term <-> standard term] (the shortest cosine distance)
         """
@@ -178,33 +313,225 @@ class Match:
             # All the vectors of the Knowledge base
             if vec is not None:
                 # Calculate Cosine Distance
-                score = cos_similarity(vec1=vec, vec2=self.synonym_vec)
+                with self.metrics.timer(stage='cosine_scoring'):
+                    rows, scores = self.search_index.search(vec=vec, k=1)
 
                 # [Sub-words] standard term Mapping
-                standard_term = self.find_standard_term(score=score, is_final=False)
+                standard_term = self.find_standard_term(input_str=input_str, rows=rows, scores=scores, is_final=False).standard_term
 
                 out_standard.append(standard_term)
             else:
-                print('There was no word vector for ', i)
+                self.log_info(event='no_word_vector', input=i)
         return out_standard
 
-    def final_mapping(self, all_standard: list) -> str:
+    def query_vector(self, all_standard: list) -> np.array:
         """
-        Final mapping
+        Get the final output Embedding, i.e., the mean Embedding of the terms
         """
-        all_vec = []
-        for i in all_standard:
-            # Each non-matched word vector
-            temp_vec = self.subword_embed_calss.get_embedding(term=i)
-            if temp_vec is not None and temp_vec not in all_vec:
-                all_vec.append(temp_vec)
+        with self.metrics.timer(stage='embedding'):
+            all_vec = []
+            for i in all_standard:
+                # Each non-matched word vector
+                temp_vec = self.subword_embed_calss.get_embedding(term=i)
+                if temp_vec is not None and not any(np.array_equal(temp_vec, j) for j in all_vec):
+                    all_vec.append(temp_vec)
+
+            # Get the final output Embedding (nan if there was no word vector)
+            vec = np.mean(all_vec, axis=0) if all_vec != [] else np.nan
+        return vec
 
+    def final_mapping(self, input_str: str, all_standard: list) -> Mapping_Result:
+        """
+        Final mapping
+        """
         # Get the final output Embedding
-        vec = np.mean(all_vec, axis=0)
+        vec = self.query_vector(all_standard=all_standard)
+        if np.ndim(vec) != 1:
+            self.metrics.count(name='no_word_vector_inputs')
+            self.log_info(event='no_word_vector', input=input_str)
+            return Mapping_Result(standard_term=None, candidates=[], scores=[])
 
-        # Calculate Cosine Distance
-        score = cos_similarity(vec1=vec, vec2=self.synonym_vec)
+        # Calculate Cosine Distance (through the search backend)
+        with self.metrics.timer(stage='cosine_scoring'):
+            rows, scores = self.search_index.search(vec=vec, k=5)
 
         # [Final] standard term Mapping
-        final_output = self.find_standard_term(score=score, is_final=True)
-        return final_output
+        return self.find_standard_term(input_str=input_str, rows=rows, scores=scores, is_final=True)
+
+    def map(self, input_str: str) -> Mapping_Result:
+        """
+        Map the input string to the standard term
+        :param input_str: Input String
+        :return: Mapping_Result of the input string
+        """
+        self.metrics.count(name='inputs')
+        if self.result_cache is not None:
+            result = self.result_cache.get(input_str=input_str)
+            if result is not None:
+                self.metrics.count(name='result_cache_hits')
+                return result
+            self.metrics.count(name='result_cache_misses')
+
+        # The time out of the stages is counted in 'map'
+        with self.metrics.trace(request=input_str), self.metrics.timer(stage='map'):
+            final_output, all_standard = self.get_all_standard(input_str=input_str)
+            if final_output is not None:
+                result = Mapping_Result(standard_term=final_output, candidates=[final_output], scores=[])
+            else:
+                result = self.final_mapping(input_str=input_str, all_standard=all_standard)
+
+        if self.result_cache is not None:
+            self.result_cache.put(input_str=input_str, result=result)
+        return result
+
+    def map_batch(self, input_strs: list, batch_size=256) -> list:
+        """
+        Map many input strings at once
+        The query Embeddings of a batch are scored against synonym_vec with one matrix-matrix product
+        :param input_strs: Input Strings
+        :param batch_size: Number of the input strings scored together, [batch_size x X] scores are kept in memory
+        :return results: Mapping_Result w.r.t. each input string
+        """
+        self.metrics.count(name='inputs', value=len(input_strs))
+        with self.metrics.trace(request='map_batch of %s input strings' % len(input_strs)), self.metrics.timer(stage='map_batch'):
+            results = []
+            for start in range(0, len(input_strs), batch_size):
+                batch_results = []
+                batch_query = []
+                batch_vec = []
+                for input_str in input_strs[start:start + batch_size]:
+                    if self.result_cache is not None:
+                        result = self.result_cache.get(input_str=input_str)
+                        if result is not None:
+                            self.metrics.count(name='result_cache_hits')
+                            batch_results.append(result)
+                            continue
+                        self.metrics.count(name='result_cache_misses')
+
+                    # Syntax and Pragmatics levels
+                    final_output, all_standard = self.get_all_standard(input_str=input_str)
+                    if final_output is not None:
+                        batch_results.append(Mapping_Result(standard_term=final_output, candidates=[final_output], scores=[]))
+                        continue
+
+                    vec = self.query_vector(all_standard=all_standard)
+                    if np.ndim(vec) != 1:
+                        # No word vector for any term
+                        self.metrics.count(name='no_word_vector_inputs')
+                        self.log_info(event='no_word_vector', input=input_str)
+                        batch_results.append(Mapping_Result(standard_term=None, candidates=[], scores=[]))
+                        continue
+
+                    batch_results.append(None)
+                    batch_query.append((len(batch_results) - 1, input_str))
+                    batch_vec.append(vec)
+
+                # Semantics level: Cosine Similarity of the whole batch [batch x Y] @ [Y x X], and the top 5 rows of each
+                if batch_vec != []:
+                    with self.metrics.timer(stage='cosine_scoring'):
+                        batch_rows, batch_scores = self.search_index.search_batch(vecs=normalize_vector(vec=batch_vec), k=5)
+                    for row, (index, input_str) in enumerate(batch_query):
+                        batch_results[index] = self.find_standard_term(input_str=input_str, rows=batch_rows[row], scores=batch_scores[row],
+                                                                       is_final=True)
+
+                if self.result_cache is not None:
+                    for input_str, result in zip(input_strs[start:start + batch_size], batch_results):
+                        self.result_cache.put(input_str=input_str, result=result)
+                results += batch_results
+            return results
+
+
+def load_match(file_threshold='200', vector_path='data/', word_dim=128, is_print=True, cache_size=0, cache_path=None,
+               index_path=None, nprobe=8, precision='float32', metrics=None) -> Match:
+    """
+    Load the resources (Knowledge Graph, Sub-words list and word vectors) and build the Match class
+    :param file_threshold: The threshold of pre_words_dict-<threshold>.csv and subwords_freq_<threshold>.csv
+    :param vector_path: The folder of the word vectors
+    :param word_dim: Dimension of the word vectors
+    :param is_print: Whether to print the mapping details
+    :param cache_size: Maximum number of the cached mapping results, not cached if it's 0
+    :param cache_path: The file of the persisted mapping results, not persisted if it's None
+    :param index_path: The IVF index built by search_index.py, the exact search if it's None
+    :param nprobe: Number of the centroids probed by a query of the IVF index
+    :param precision: The precision of the synonym matrix, 'float32', 'float16', or 'int8' (exact search only)
+    :param metrics: The Metrics class of the timers, counters and traces (see instrumentation.py), disabled if it's None
+    :return match_class: The Match class
+    """
+    # Get the standard terms, synonym terms, and terms' sub-words
+    knowledge_path = 'pre_words_dict-' + file_threshold + '.csv'
+    subword_path = 'subwords_freq_' + file_threshold + '.csv'
+    knowledge = read_csv(path_txt=knowledge_path)
+    standard_terms, standard_synonym = knowledge[:, 0], knowledge[:, 1]
+    print('There are', np.shape(standard_synonym)[0], 'standard and synonym terms!')
+
+    # Get the sub-words list
+    subword_list = read_csv(path_txt=subword_path)
+    subword_list = subword_list[:, 1]
+
+    # Load standard-trained vectors and get word Embeddings of standard and synonym words
+    pre_trained = load_word_vector(path=vector_path, word_dim=word_dim)
+    metrics = metrics if metrics is not None else Metrics()
+    subword_embed = Subword_Embedding(sub_list=subword_list, pre_trained=pre_trained, standard_synonym=standard_synonym, metrics=metrics)
+
+    # The sub-words of the standard and synonym terms, precomputed in the sidecar file of the Knowledge Base
+    synonym_subs, rerank_subs = load_segmentation_cached(subword_embed=subword_embed, inputs=[knowledge_path, subword_path],
+                                                         path=knowledge_path[:-len('.csv')] + '.subwords.npz')
+    knowledge_index = Knowledge_Index(knowledge=knowledge, rerank_subs=rerank_subs)
+
+    inputs = [knowledge_path, subword_path] + word_vector_files(path=vector_path)
+    synonym_vec, synonym_term = load_standard_vector_cached(subword_embed=subword_embed, inputs=inputs, synonym_subs=synonym_subs)
+    print('There are', np.shape(synonym_term)[0], 'standard and synonym terms that own word vectors!')
+
+    # The search backend
+    search_index = None
+    if precision != 'float32':
+        if index_path is not None:
+            raise ValueError('The IVF index is only for float32 word vectors')
+        search_index = Quantized_Index(synonym_vec=synonym_vec, precision=precision)
+
+        # Only the reduced-precision synonym matrix is kept
+        synonym_vec = search_index.synonym_vec
+        print('The synonym matrix is kept in', precision)
+    elif index_path is not None:
+        search_index = IVF_Index.load(path=index_path, synonym_vec=synonym_vec, nprobe=nprobe)
+        print('Load the IVF index of', search_index.centroids.shape[0], 'centroids from', index_path)
+
+    # The cached mapping results are bound to the fingerprint of the loaded artifacts and the search backend
+    result_cache = None
+    if cache_size > 0:
+        index_inputs = [] if index_path is None else [index_path]
+        fingerprint = '%s-%s-%s' % (artifact_key(inputs=inputs + index_inputs, cache_dir='cache/'), precision,
+                                    nprobe if index_path is not None else 'exact')
+        result_cache = Result_Cache(max_size=cache_size, path=cache_path, fingerprint=fingerprint)
+
+    return Match(knowledge=knowledge,
+                 knowledge_index=knowledge_index,
+                 standard_terms=standard_terms,
+                 standard_synonym=standard_synonym,
+                 sub_list=subword_list,
+                 pre_trained=pre_trained,
+                 synonym_vec=synonym_vec,
+                 synonym_term=synonym_term,
+                 subword_embed=subword_embed,
+                 is_print=is_print,
+                 result_cache=result_cache,
+                 search_index=search_index,
+                 metrics=metrics)
+
+
+def add_match_arguments(parser, is_cache=True):
+    """
+    Add the command-line arguments of load_match() to an argparse parser
+    :param parser: The argparse parser
+    :param is_cache: Whether to add the arguments of the mapping results cache
+    """
+    parser.add_argument('--threshold', default='200', help='The threshold of the Knowledge Base and the sub-words list')
+    parser.add_argument('--vector_path', default='data/', help='The folder of the word vectors')
+    parser.add_argument('--word_dim', type=int, default=128, help='Dimension of the word vectors')
+    if is_cache:
+        parser.add_argument('--cache_size', type=int, default=10000, help='Maximum number of the cached mapping results, 0 to disable the cache')
+        parser.add_argument('--cache_path', default=None, help='The file of the persisted mapping results, not persisted if it is not given')
+    parser.add_argument('--index_path', default=None, help='The IVF index built by search_index.py, the exact search if it is not given')
+    parser.add_argument('--nprobe', type=int, default=8, help='Number of the centroids probed by a query of the IVF index')
+    parser.add_argument('--precision', default='float32', choices=('float32', 'float16', 'int8'),
+                        help='The precision of the synonym matrix, float16 and int8 save memory but are upcast block by block on every query')
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import codecs
+import argparse
+from utility import *
+from vector_store import TEXT_FILE
+
+
+def add_ngrams(term: str, max_len: int, vocabulary: set):
+    """
+    Add all the character N-grams (N <= max_len) of the term to the vocabulary
+    FMM/BMM sub-words, Jieba tokens, N-grams and English items are all N-grams of the term
+    """
+    for start in range(len(term)):
+        for end in range(start + 1, min(len(term), start + max_len) + 1):
+            vocabulary.add(term[start:end])
+
+
+def reachable_vocabulary(terms: list, max_len: int, vocabulary=None) -> set:
+    """
+    Get the words that the mapper might look up for the terms
+    :param terms: Input strings, standard terms or synonym terms
+    :param max_len: The length of the longest word of the word vectors
+    :param vocabulary: The vocabulary to be extended, a new one is built if it's None
+    :return vocabulary: The reachable words
+    """
+    if vocabulary is None:
+        vocabulary = set()
+
+    for term in terms:
+        term = str(term)
+        temp_str = remove_punctuation(term=term).lower()
+        re_eng, eng_in_term = find_English_term(term=temp_str)
+
+        # The original string is used by the non-matched sub-words,
+        # the string without punctuations (not lowercased) by the Embeddings of the standard and synonym terms
+        for form in [term, remove_punctuation(term=term), temp_str, re_eng] + eng_in_term[0]:
+            add_ngrams(term=form, max_len=max_len, vocabulary=vocabulary)
+    return vocabulary
+
+
+def read_corpus(path: str) -> list:
+    """
+    Read the sample input corpus, one input string per line
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        corpus = [line.strip() for line in fp]
+    return [line for line in corpus if line != '']
+
+
+def read_vocabulary(path: str, word_dim: int) -> set:
+    """
+    Read the words of the text word vectors (word_vectors.vec)
+    """
+    words = set()
+    for line in codecs.open(path + TEXT_FILE, 'r', encoding='utf-8'):
+        line = line.rstrip().split()
+        if len(line) == word_dim + 1:
+            words.add(line[0])
+    return words
+
+
+def coverage_lost(words: set, base: set, corpus: list, max_len: int) -> float:
+    """
+    Estimate the coverage lost on unseen input strings
+    Half of the corpus is used for pruning, the other half is held out
+    :param words: The words of the word vectors
+    :param base: The reachable words of the sub-words and the Knowledge Base
+    :param corpus: The sample input corpus
+    :return: Ratio of the held-out look-ups (that own word vectors) that are pruned
+    """
+    kept = reachable_vocabulary(terms=corpus[0::2], max_len=max_len, vocabulary=set(base)) & words
+    held_out = reachable_vocabulary(terms=corpus[1::2], max_len=max_len) & words
+    if len(held_out) == 0:
+        return 0.0
+    return len(held_out - kept) / len(held_out)
+
+
+def prune_word_vector(path: str, out_path: str, word_dim: int, vocabulary: set) -> tuple:
+    """
+    Write the word vectors of the reachable words only
+    :param path: The folder of the original word_vectors.vec
+    :param out_path: The folder of the pruned word_vectors.vec
+    :param word_dim: Dimension of the word vectors
+    :param vocabulary: The reachable words
+    :return total: Number of the original word vectors
+    :return kept: Number of the pruned word vectors
+    """
+    os.makedirs(out_path, exist_ok=True)
+    total = kept = 0
+    with open(out_path + TEXT_FILE, 'w', encoding='utf-8') as fp:
+        for line in codecs.open(path + TEXT_FILE, 'r', encoding='utf-8'):
+            word = line.rstrip().split()
+            if len(word) != word_dim + 1:
+                continue
+            total += 1
+            if word[0] in vocabulary:
+                fp.write(line.rstrip() + '\n')
+                kept += 1
+    return total, kept
+
+
+# The main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prune the word vectors to the words the mapper can ever request')
+    parser.add_argument('--path', default='data/', help='The folder of word_vectors.vec')
+    parser.add_argument('--out_path', default='data/pruned/', help='The folder of the pruned word_vectors.vec')
+    parser.add_argument('--word_dim', type=int, default=128, help='Dimension of the word vectors')
+    parser.add_argument('--threshold', default='200', help='The file threshold of pre_words_dict-*.csv and subwords_freq_*.csv')
+    parser.add_argument('--corpus', default=None, help='Optional sample input corpus, one input string per line')
+    args = parser.parse_args()
+
+    # Get the Knowledge Base and the sub-words list
+    knowledge = read_csv(path_txt='pre_words_dict-' + args.threshold + '.csv')
+    subword_list = read_csv(path_txt='subwords_freq_' + args.threshold + '.csv')[:, 1]
+    corpus = read_corpus(path=args.corpus) if args.corpus is not None else []
+
+    words = read_vocabulary(path=args.path, word_dim=args.word_dim)
+    max_len = max([len(word) for word in words], default=0)
+
+    # The reachable words of the sub-words, standard and synonym terms, and the sample input corpus
+    base = set(str(sub) for sub in subword_list)
+    base = reachable_vocabulary(terms=np.concatenate([knowledge[:, 0], knowledge[:, 1]]), max_len=max_len, vocabulary=base)
+    vocabulary = reachable_vocabulary(terms=corpus, max_len=max_len, vocabulary=set(base))
+
+    total, kept = prune_word_vector(path=args.path, out_path=args.out_path, word_dim=args.word_dim, vocabulary=vocabulary)
+    print('Kept', kept, 'of', total, 'word vectors (%.2f%% pruned), saved to' % (100 * (1 - kept / max(total, 1))),
+          args.out_path + TEXT_FILE)
+
+    if corpus != []:
+        lost = coverage_lost(words=words, base=base, corpus=corpus, max_len=max_len)
+        print('Estimated coverage lost on unseen input strings: %.2f%% of the look-ups that own word vectors' % (100 * lost))
+    else:
+        print('No sample corpus, the input strings can only use the words of the Knowledge Base and the sub-words')
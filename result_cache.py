@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import threading
+import collections
+from artifact_cache import save_atomic
+
+
+class Result_Cache:
+    """
+    Bounded LRU cache of the mapping results: input string -> Mapping_Result (final mapping and top K)
+    The cache belongs to one fingerprint of the loaded artifacts (Knowledge Base, sub-words list and word vectors),
+    a persisted cache of another fingerprint is discarded when it's loaded
+    """
+    def __init__(self, max_size=10000, path=None, fingerprint=''):
+        """
+        :param max_size: Maximum number of the cached results
+        :param path: The file of the persisted cache, not persisted if it's None
+        :param fingerprint: The fingerprint of the loaded artifacts, see artifact_cache.artifact_key
+        """
+        self.max_size = max_size
+        self.path = path
+        self.fingerprint = fingerprint
+        self.results = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+
+    @staticmethod
+    def cache_key(input_str: str) -> str:
+        """
+        Get the cache key of an input string
+        The raw string is used: the mapping depends on its spaces and punctuations (see Match.non_match_word)
+        """
+        return input_str
+
+    def get(self, input_str: str):
+        """
+        Get the cached result of the input string
+        :return: The Mapping_Result, None if it's not cached
+        """
+        key = self.cache_key(input_str=input_str)
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, input_str: str, result):
+        """
+        Cache the result of the input string, the least recently used result is evicted if the cache is full
+        """
+        if self.max_size <= 0:
+            return
+        key = self.cache_key(input_str=input_str)
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the metrics of the cache
+        :return: {'size', 'max_size', 'hits', 'misses', 'hit_rate'}
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return {'size': len(self.results), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total != 0 else 0.0}
+
+    def load(self):
+        """
+        Load the persisted cache, if it was saved with the same fingerprint
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as fp:
+            cache = pickle.load(fp)
+        if cache['fingerprint'] != self.fingerprint:
+            print('The cached mapping results are out of date, and discarded:', self.path)
+            return
+        with self.lock:
+            # The results are saved from the least to the most recently used
+            for key, result in cache['results'][-self.max_size:] if self.max_size > 0 else []:
+                self.results[key] = result
+        print('There are', len(self.results), 'cached mapping results loaded from', self.path)
+
+    def save(self):
+        """
+        Persist the cache with its fingerprint
+        """
+        if self.path is None:
+            return
+        with self.lock:
+            cache = {'fingerprint': self.fingerprint, 'results': list(self.results.items())}
+
+        def save_func(temp_path):
+            with open(temp_path, 'wb') as fp:
+                pickle.dump(cache, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        save_atomic(path=self.path, save_func=save_func)
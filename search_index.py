@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import hashlib
+import argparse
+import numpy as np
+from artifact_cache import save_atomic
+from utility import top_k
+from vector_store import quantize_int8
+
+
+def matrix_fingerprint(matrix: np.array) -> str:
+    """
+    Get the fingerprint of a matrix (shape, dtype and values), to check that an index was built from it
+    """
+    matrix = np.ascontiguousarray(matrix)
+    sha = hashlib.sha256(('%s %s' % (matrix.shape, matrix.dtype)).encode('utf-8'))
+    sha.update(matrix.tobytes())
+    return sha.hexdigest()
+
+
+class Exact_Index:
+    """
+    Brute-force search over the L2-normalized word vectors of the standard and synonym terms (the default)
+    The Cosine Similarity of every row is one matrix-vector product
+    """
+    def __init__(self, synonym_vec: np.array):
+        """
+        :param synonym_vec: L2-normalized word vectors [X x Y]
+        """
+        self.synonym_vec = synonym_vec
+
+    def search(self, vec: np.array, k: int) -> tuple:
+        """
+        Get the top K rows most similar to a query vector
+        :param vec: The query vector [Y]
+        :param k: K
+        :return rows: The top K rows, in descending order of the scores (ties: the smaller row first)
+        :return scores: The Cosine Similarity of the top K rows
+        """
+        vec = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm != 0:
+            vec = vec / norm
+        rows, scores = self.search_batch(vecs=vec[None, :], k=k)
+        return rows[0], scores[0]
+
+    def search_batch(self, vecs: np.array, k: int) -> tuple:
+        """
+        Get the top K rows most similar to each L2-normalized query vector
+        :param vecs: The L2-normalized query vectors [B x Y]
+        :param k: K
+        :return rows: The top K rows w.r.t. each query vector [B x K]
+        :return scores: The Cosine Similarity of the top K rows [B x K]
+        """
+        return top_k(score=self.score_batch(vecs=vecs), k=k)
+
+    def score_batch(self, vecs: np.array) -> np.array:
+        """
+        Get the Cosine Similarity between the L2-normalized query vectors and every row
+        :param vecs: The L2-normalized query vectors [B x Y]
+        :return: The scores [B x X]
+        """
+        return np.asarray(vecs, dtype=self.synonym_vec.dtype) @ self.synonym_vec.T
+
+
+class Quantized_Index(Exact_Index):
+    """
+    Brute-force search over the reduced-precision word vectors of the standard and synonym terms
+        float16: half the memory of float32
+        int8: a quarter of the memory, symmetric quantization with a scale per row (and per query)
+    The rows are upcast to float32 and scored block by block, in one float32 buffer of block_size rows,
+    so that no float32 copy of the whole matrix is made, the upcast is paid by every query
+    """
+    def __init__(self, synonym_vec: np.array, precision='int8', block_size=2048):
+        """
+        :param synonym_vec: L2-normalized word vectors [X x Y]
+        :param precision: 'float16' or 'int8'
+        :param block_size: Number of the rows scored at once, the float32 buffer is [block_size x Y]
+        """
+        if precision not in ('float16', 'int8'):
+            raise ValueError('Unknown precision: {}'.format(precision))
+        self.precision = precision
+        self.block_size = block_size
+        self.scale = None
+        if precision == 'float16':
+            super().__init__(synonym_vec=np.ascontiguousarray(synonym_vec, dtype=np.float16))
+        else:
+            quantized, self.scale = quantize_int8(matrix=synonym_vec)
+            super().__init__(synonym_vec=quantized)
+
+    def score_batch(self, vecs: np.array) -> np.array:
+        vecs = np.asarray(vecs, dtype=np.float32)
+        if self.precision == 'int8':
+            # int8 query, the int8 products are summed exactly in float32 (|sum| <= Y * 127 * 127 < 2 ** 24)
+            vecs, vec_scale = quantize_int8(matrix=vecs)
+            vecs = vecs.astype(np.float32)
+
+        scores = np.empty((vecs.shape[0], self.synonym_vec.shape[0]), dtype=np.float32)
+        buffer = np.empty((min(self.block_size, self.synonym_vec.shape[0]), self.synonym_vec.shape[1]), dtype=np.float32)
+        for start in range(0, self.synonym_vec.shape[0], self.block_size):
+            block = self.synonym_vec[start:start + self.block_size]
+            np.copyto(buffer[:len(block)], block)
+            scores[:, start:start + len(block)] = vecs @ buffer[:len(block)].T
+
+        if self.precision == 'int8':
+            # Rescale the int8 dot products
+            scores *= vec_scale[:, None]
+            scores *= self.scale[None, :]
+        return scores
+
+
+class IVF_Index(Exact_Index):
+    """
+    Inverted File (IVF) index, an approximate nearest-neighbour search for large Knowledge Bases
+    The rows are clustered around nlist centroids (spherical k-means), and a query only scores the rows
+    of its nprobe most similar centroids
+    Recall and latency both grow with nprobe, nprobe == nlist is the exact search
+    """
+    def __init__(self, synonym_vec: np.array, centroids: np.array, order: np.array, offsets: np.array, nprobe=8):
+        """
+        :param synonym_vec: L2-normalized word vectors [X x Y]
+        :param centroids: L2-normalized centroids [nlist x Y]
+        :param order: The rows sorted by their centroids [X]
+        :param offsets: The rows of the i-th centroid are order[offsets[i]:offsets[i + 1]] [nlist + 1]
+        :param nprobe: Number of the centroids probed by a query
+        """
+        super().__init__(synonym_vec=synonym_vec)
+        self.centroids = np.ascontiguousarray(centroids, dtype=synonym_vec.dtype)
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, synonym_vec: np.array, nlist=0, n_iter=20, seed=0, nprobe=8):
+        """
+        Build the index with spherical k-means
+        :param synonym_vec: L2-normalized word vectors [X x Y]
+        :param nlist: Number of the centroids, 4 * sqrt(X) if it's 0
+        :param n_iter: Number of the k-means iterations
+        :param seed: The random seed of the initial centroids
+        :param nprobe: Number of the centroids probed by a query
+        :return: The IVF index
+        """
+        rows = synonym_vec.shape[0]
+        if nlist <= 0:
+            nlist = int(4 * np.sqrt(rows))
+        nlist = max(1, min(nlist, rows))
+
+        # Initial centroids: distinct random rows
+        random = np.random.RandomState(seed)
+        centroids = synonym_vec[random.choice(rows, size=nlist, replace=False)].astype(np.float32)
+        for _ in range(n_iter):
+            assign = np.argmax(synonym_vec @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, synonym_vec)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+
+            # An empty centroid keeps its old position
+            non_empty = norms[:, 0] > 0
+            centroids[non_empty] = sums[non_empty] / norms[non_empty]
+
+        assign = np.argmax(synonym_vec @ centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(synonym_vec=synonym_vec, centroids=centroids, order=order, offsets=offsets, nprobe=nprobe)
+
+    def probe_rows(self, vec: np.array) -> np.array:
+        """
+        Get the rows of the nprobe centroids most similar to the query vector
+        """
+        centroid_score = self.centroids @ vec
+        nprobe = min(self.nprobe, len(centroid_score))
+        probe = np.argpartition(-centroid_score, nprobe - 1)[:nprobe]
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in probe])
+
+    def search_batch(self, vecs: np.array, k: int) -> tuple:
+        """
+        Get the top K rows most similar to each L2-normalized query vector, among the rows of the probed centroids
+        :return rows: The top K rows w.r.t. each query vector, fewer than K if fewer rows are probed
+        :return scores: The Cosine Similarity of the top K rows
+        """
+        vecs = np.asarray(vecs, dtype=self.synonym_vec.dtype)
+        batch_rows = []
+        batch_scores = []
+        for vec in vecs:
+            # The probed rows are sorted, so that the ties are broken by the rows as the exact search does
+            rows = np.sort(self.probe_rows(vec=vec))
+            index, scores = top_k(score=self.synonym_vec[rows] @ vec, k=k)
+            batch_rows.append(rows[index])
+            batch_scores.append(scores)
+        return batch_rows, batch_scores
+
+    def save(self, path: str):
+        """
+        Save the index with the fingerprint of its word vectors
+        """
+        def save_func(temp_path):
+            with open(temp_path, 'wb') as fp:
+                np.savez(fp, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                         fingerprint=np.array(matrix_fingerprint(matrix=self.synonym_vec)))
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        save_atomic(path=path, save_func=save_func)
+
+    @classmethod
+    def load(cls, path: str, synonym_vec: np.array, nprobe=8):
+        """
+        Load the index built from the same word vectors
+        :param path: The path of the index
+        :param synonym_vec: L2-normalized word vectors [X x Y]
+        :param nprobe: Number of the centroids probed by a query
+        :return: The IVF index
+        """
+        with np.load(path, allow_pickle=False) as index:
+            if str(index['fingerprint']) != matrix_fingerprint(matrix=synonym_vec):
+                raise ValueError('The index {} was built from other word vectors, please rebuild it'.format(path))
+            return cls(synonym_vec=synonym_vec, centroids=index['centroids'], order=index['order'], offsets=index['offsets'],
+                       nprobe=nprobe)
+
+
+def recall(index, synonym_vec: np.array, queries: np.array, k=5) -> float:
+    """
+    Get the recall of the top K rows of an index w.r.t. the exact search
+    """
+    exact, _ = Exact_Index(synonym_vec=synonym_vec).search_batch(vecs=queries, k=k)
+    approximate, _ = index.search_batch(vecs=queries, k=k)
+    return np.mean([len(set(i) & set(j)) / k for i, j in zip(exact, approximate)])
+
+
+# The main function
+if __name__ == '__main__':
+    from match_func import load_match
+
+    parser = argparse.ArgumentParser(description='Build the IVF index over the word vectors of the standard and synonym terms')
+    parser.add_argument('--threshold', default='200', help='The threshold of the Knowledge Base and the sub-words list')
+    parser.add_argument('--vector_path', default='data/', help='The folder of the word vectors')
+    parser.add_argument('--word_dim', type=int, default=128, help='Dimension of the word vectors')
+    parser.add_argument('--index_path', default=None, help='The path of the index, cache/ivf_index-<threshold>.npz by default')
+    parser.add_argument('--nlist', type=int, default=0, help='Number of the centroids, 4 * sqrt(rows) by default')
+    parser.add_argument('--n_iter', type=int, default=20, help='Number of the k-means iterations')
+    parser.add_argument('--nprobe', type=int, default=8, help='Number of the probed centroids, to report the recall')
+    args = parser.parse_args()
+    index_path = args.index_path or 'cache/ivf_index-' + args.threshold + '.npz'
+
+    synonym_vec = load_match(file_threshold=args.threshold, vector_path=args.vector_path, word_dim=args.word_dim, is_print=False).synonym_vec
+    index = IVF_Index.build(synonym_vec=synonym_vec, nlist=args.nlist, n_iter=args.n_iter, nprobe=args.nprobe)
+    index.save(path=index_path)
+    print('The IVF index of', synonym_vec.shape[0], 'rows and', index.centroids.shape[0], 'centroids is saved to', index_path)
+
+    # The rows themselves are used as the queries
+    queries = synonym_vec[np.random.RandomState(0).choice(synonym_vec.shape[0], size=min(1000, synonym_vec.shape[0]), replace=False)]
+    print('Recall@5 (nprobe = %s): %.4f' % (args.nprobe, recall(index=index, synonym_vec=synonym_vec, queries=queries)))
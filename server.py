@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from match_func import load_match, add_match_arguments
+from instrumentation import Metrics, JSON_Sink
+
+
+def result_to_json(input_str: str, result) -> dict:
+    """
+    Convert a Mapping_Result to a JSON-serializable dictionary
+    :param input_str: The input string
+    :param result: The Mapping_Result of the input string
+    :return: {'input', 'standard_term', 'candidates', 'scores'}
+    """
+    return {'input': input_str,
+            'standard_term': None if result.standard_term is None else str(result.standard_term),
+            'candidates': [str(i) for i in result.candidates],
+            'scores': [float(i) for i in result.scores]}
+
+
+class Mapping_Handler(BaseHTTPRequestHandler):
+    """
+    HTTP request handler of the mapping service
+        POST /map         {"input": "..."}        -> {"input", "standard_term", "candidates", "scores"}
+        POST /map_batch   {"inputs": ["...", ...]} -> {"results": [...]}
+        GET  /health                               -> {"status": "ok", "cache": metrics of the result cache,
+                                                        "metrics": timers and counters (if enabled)}
+    The Match class and the worker semaphore are shared by the server
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status: int, data: dict):
+        """
+        Send a JSON response
+        """
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> dict:
+        """
+        Read the JSON body of the request
+        """
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError('The request body should be a JSON object')
+        return data
+
+    def do_GET(self):
+        if self.path == '/health':
+            result_cache = self.server.match_class.result_cache
+            metrics = self.server.match_class.metrics
+            self.send_json(status=200, data={'status': 'ok', 'cache': None if result_cache is None else result_cache.stats(),
+                                             'metrics': metrics.snapshot() if metrics.enabled else None})
+        else:
+            self.send_json(status=404, data={'error': 'Not found: ' + self.path})
+
+    def do_POST(self):
+        if self.path not in ('/map', '/map_batch'):
+            self.send_json(status=404, data={'error': 'Not found: ' + self.path})
+            return
+
+        try:
+            data = self.read_json()
+            if self.path == '/map':
+                input_strs = [data['input']]
+            else:
+                input_strs = data['inputs']
+            if not isinstance(input_strs, list) or not all(isinstance(i, str) for i in input_strs):
+                raise ValueError('The input(s) should be string(s)')
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(status=400, data={'error': 'Bad request: ' + str(error)})
+            return
+
+        # At most <workers> requests are mapped at the same time
+        try:
+            with self.server.semaphore:
+                if self.path == '/map':
+                    results = [self.server.match_class.map(input_str=input_strs[0])]
+                else:
+                    results = self.server.match_class.map_batch(input_strs=input_strs)
+            results = [result_to_json(input_str=i, result=j) for i, j in zip(input_strs, results)]
+        except Exception as error:
+            self.send_json(status=500, data={'error': repr(error)})
+            return
+
+        if self.path == '/map':
+            self.send_json(status=200, data=results[0])
+        else:
+            self.send_json(status=200, data={'results': results})
+
+    def log_message(self, format, *args):
+        if self.server.is_log:
+            super().log_message(format, *args)
+
+
+def make_server(match_class, host='127.0.0.1', port=8000, workers=4, is_log=False) -> ThreadingHTTPServer:
+    """
+    Build the mapping service (not started)
+    :param match_class: The Match class shared by all the requests
+    :param host: The host to bind
+    :param port: The port to bind, 0 for any free port
+    :param workers: Number of the requests mapped concurrently
+    :param is_log: Whether to log every request
+    :return server: The HTTP server, call serve_forever() to start
+    """
+    server = ThreadingHTTPServer((host, port), Mapping_Handler)
+    server.daemon_threads = True
+    server.match_class = match_class
+    server.semaphore = threading.BoundedSemaphore(workers)
+    server.is_log = is_log
+    return server
+
+
+# The main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local HTTP service of the concept mapping')
+    parser.add_argument('--host', default='127.0.0.1', help='The host to bind')
+    parser.add_argument('--port', type=int, default=8000, help='The port to bind')
+    parser.add_argument('--workers', type=int, default=4, help='Number of the requests mapped concurrently')
+    add_match_arguments(parser=parser)
+    parser.add_argument('--log', action='store_true', help='Log every request')
+    parser.add_argument('--metrics', action='store_true', help='Record the time of each stage and the counters, reported by GET /health')
+    parser.add_argument('--trace_path', default=None, help='The JSON lines file of the per-request traces (only with --metrics)')
+    args = parser.parse_args()
+
+    # The metrics are disabled by default
+    sink = JSON_Sink(path=args.trace_path) if args.trace_path is not None else None
+    metrics = Metrics(enabled=args.metrics, is_trace=sink is not None, sink=sink)
+
+    # Load the resources once, the mapping details are not printed
+    match_class = load_match(file_threshold=args.threshold, vector_path=args.vector_path, word_dim=args.word_dim, is_print=False,
+                             cache_size=args.cache_size, cache_path=args.cache_path, index_path=args.index_path, nprobe=args.nprobe,
+                             precision=args.precision, metrics=metrics)
+
+    server = make_server(match_class=match_class, host=args.host, port=args.port, workers=args.workers, is_log=args.log)
+    print('Serving the concept mapping on http://%s:%s' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if match_class.result_cache is not None:
+            match_class.result_cache.save()
+        if sink is not None:
+            sink.close()
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import jieba
+import functools
+from instrumentation import Metrics
 from utility import *
 
 
@@ -9,45 +11,66 @@ class Subword_Embedding:
     """
     Get Subwords via FMM and BMM algorithm
     Get Word Embedding of sub-word
+    The only per-term state is the memoized Embeddings (a thread-safe LRU), so that it can be shared by threads
     """
-    def __init__(self, sub_list, pre_trained, standard_synonym):
+    def __init__(self, sub_list, pre_trained, standard_synonym, embedding_cache_size=100000, metrics=None):
+        """
+        :param sub_list: Sub-words Frequency List
+        :param pre_trained: standard-trained word vectors
+        :param standard_synonym: standard terms and their Synonyms
+        :param embedding_cache_size: Maximum number of the memoized term Embeddings
+        :param metrics: The Metrics class of the timers and the counters (see instrumentation.py), disabled if it's None
+        """
         self.sub_list = sub_list
         self.pre_trained = pre_trained
         self.standard_synonym = standard_synonym
+        self.metrics = metrics if metrics is not None else Metrics()
+
+        # Hashed sub-word index, built once, for O(1) look-ups in FMM and BMM
+        self.sub_set = set(self.sub_list)
+        self.max_len = len(self.sub_list[0])
+
+        # The same sub-words and terms come up over and over across synonyms and queries
+        self.memo_embedding = functools.lru_cache(maxsize=embedding_cache_size)(self.compute_embedding)
 
-    def FMM(self, term: str):
+    def FMM(self, term: str) -> list:
         """
         Forward Maximum Matching (FMM)
         Get Embeddings
         """
+        subs = []
+        len_term = len(term)
         start = 0
-        while start != self.len_term:
+        while start != len_term:
             index = start + self.max_len
-            if index > self.len_term:
-                index = self.len_term
+            if index > len_term:
+                index = len_term
             for i in range(self.max_len):
-                if (term[start:index] in self.sub_list) or (len(term[start:index]) == 1):
-                    self.standard_subs.append(term[start:index])
+                if (term[start:index] in self.sub_set) or (len(term[start:index]) == 1):
+                    subs.append(term[start:index])
                     start = index
                     break
                 index += -1
+        return subs
 
-    def BMM(self, term: str):
+    def BMM(self, term: str) -> list:
         """
         Backward Maximum Matching (BMM)
         Get Embeddings
         """
-        start = self.len_term
+        subs = []
+        start = len(term)
         while start != 0:
             index = start - self.max_len
             if index < 0:
                 index = 0
             for i in range(self.max_len):
-                if (term[index:start] in self.sub_list) or (len(term[index:start]) == 1):
-                    self.standard_subs.append(term[index:start])
+                if (term[index:start] in self.sub_set) or (len(term[index:start]) == 1):
+                    subs.append(term[index:start])
                     start = index
                     break
                 index += 1
+        return subs
 
     def get_subword(self, term: str, is_print: bool) -> list:
         """
@@ -57,29 +80,37 @@ class Subword_Embedding:
         Reference: https://zhuanlan.zhihu.com/p/103392455
         :param term: The Input Term
         """
-        self.standard_subs = []
-        self.len_term = len(term)
-        self.max_len = len(self.sub_list[0])
+        with self.metrics.timer(stage='fmm_bmm'):
+            if len(term) != 0:
+                standard_subs = self.FMM(term=term) + self.BMM(term=term)
 
-        if self.len_term != 0:
-            self.FMM(term=term)
-            self.BMM(term=term)
-
-            # Remove repeated sub-words
-            self.standard_subs = list(set(self.standard_subs))
-        else:
-            self.standard_subs.append('')
+                # Remove repeated sub-words
+                standard_subs = list(set(standard_subs))
+            else:
+                standard_subs = ['']
 
         if is_print is True:
-            print('Sub-word(s) are ', self.standard_subs)
-        return self.standard_subs
+            print('Sub-word(s) are ', standard_subs)
+        return standard_subs
 
-    def jieba_subword(self, term: str, negative: int) -> tuple:
+    def add_gram(self, token: str, grams: list, seen: set):
+        """
+        Add the word vector of a token to the grams, unless the token has no vector or an identical vector was added
+        """
+        temp_vec = self.pre_trained.get(token)
+        if temp_vec is not None and token != '':
+            key = temp_vec.tobytes()
+            if key not in seen:
+                seen.add(key)
+                grams.append(temp_vec)
+
+    def jieba_subword(self, term: str, negative: int, grams: list, seen: set) -> tuple:
         """
         Jieba tokenizatin Embedding and Subword Embedding
         """
         neg_word = ['非', '不', '无', '否', '假']
-        jieba_token = jieba.lcut(term, HMM=True)
+        with self.metrics.timer(stage='jieba'):
+            jieba_token = jieba.lcut(term, HMM=True)
         subword_token = self.get_subword(term=term, is_print=False)
         tokens = jieba_token + subword_token
 
@@ -89,30 +120,10 @@ class Subword_Embedding:
                 term.replace(token, '')
                 continue
             else:
-                temp_vec = self.pre_trained.get(token)
-                if temp_vec is not None and token != '':
-                    temp_vec = temp_vec.tolist()
-                    if temp_vec not in self.grams:
-                        self.grams.append(temp_vec)
+                self.add_gram(token=token, grams=grams, seen=seen)
         return term, negative
 
-    # def jieba_subword(self, term: str) -> tuple:
-    #     """
-    #     Jieba tokenizatin Embedding and Subword Embedding
-    #     """
-    #     jieba_token = jieba.lcut(term, HMM=True)
-    #     subword_token = self.get_subword(term=term, is_print=False)
-    #     tokens = jieba_token + subword_token
-    #
-    #     for token in tokens:
-    #         temp_vec = self.pre_trained.get(token)
-    #         if temp_vec is not None and token != '':
-    #             temp_vec = temp_vec.tolist()
-    #             if temp_vec not in self.grams:
-    #                 self.grams.append(temp_vec)
-    #     return term
-
-    def n_gram(self, term: list):
+    def n_gram(self, term: list, grams: list, seen: set):
         """
         Get N-gram Embeddings from the term
         """
@@ -121,65 +132,107 @@ class Subword_Embedding:
             temp_grams = [term[index:t + 1] for t in range(len(term))]
 
             for temp_gram in temp_grams:
-                temp_vec = self.pre_trained.get(temp_gram)
-                if temp_vec is not None and temp_gram != '':
-                    temp_vec = temp_vec.tolist()
-                    if temp_vec not in self.grams:
-                        self.grams.append(temp_vec)
+                self.add_gram(token=temp_gram, grams=grams, seen=seen)
             index += 1
 
+    def compute_embedding(self, term: str) -> np.array:
+        """
+        Get a word's embedding, see get_embedding()
+        """
+        self.metrics.count(name='embedding_computed')
+        with self.metrics.timer(stage='embedding'):
+            vec = self.pre_trained.get(term)
+
+            if vec is not None:
+                outvec = np.array(vec, dtype=np.float64)
+            else:
+                # Out-of-vocabulary term
+                self.metrics.count(name='oov_lookups')
+
+                # Some standard-defined rules
+                # grams: the distinct word vectors, seen: their bytes, for O(1) de-duplication
+                grams = []
+                seen = set()
+                negative = 0
+                term, negative = self.jieba_subword(term=term, negative=negative, grams=grams, seen=seen)  # Jieba and sub-word Embedding
+                self.n_gram(term=term, grams=grams, seen=seen)  # N-gram Embedding
+                if grams == []:
+                    self.metrics.count(name='no_word_vector')
+                    return None
+
+                # Return outvec
+                outvec = np.mean(np.array(grams, dtype=np.float64), axis=0)
+                if negative == 1:
+                    outvec = outvec * -1
+
+        # The vector is shared by the memoized calls
+        outvec.setflags(write=False)
+        return outvec
+
     def get_embedding(self, term: str) -> np.array:
         """
-        Get a word's embedding
+        Get a word's embedding, memoized per term (see embedding_cache_size)
+        :param term: The word or term
+        :return: Read-only float64 vector, None if there is no word vector for the term
         """
-        vec = self.pre_trained.get(term)
+        # The memoized look-ups are the ones that are not computed (embedding_lookups - embedding_computed)
+        self.metrics.count(name='embedding_lookups')
+        return self.memo_embedding(term)
 
-        if vec is not None:
-            return vec.tolist()
-        else:
-            # Some standard-defined rules
-            self.grams = []
-            negative = 0
-            term, negative = self.jieba_subword(term=term, negative=negative)  # Jieba and sub-word Embedding
-            # term = self.jieba_subword(term=term)  # Jieba and sub-word Embedding
-            self.n_gram(term=term)  # N-gram Embedding
+    def segment_synonyms(self) -> tuple:
+        """
+        Get the sub-words of all the standard and synonym terms, they only depend on the Knowledge Base and the sub-words list
+        :return synonym_subs: The sub-words of each term (punctuations removed), for the word Embeddings
+        :return rerank_subs: The space-joined sub-words of each term (punctuations and English removed),
+                             for the Sub-words frequency of the Final Mapping (see Match.top_k_result)
+        """
+        synonym_subs = []
+        rerank_subs = []
+        for i in self.standard_synonym:
+            i = remove_punctuation(term=i)
+            synonym_subs.append(self.get_subword(term=i, is_print=False))
 
-            # Return outvec
-            if negative == 1:
-                outvec = None if self.grams == [] else (np.mean(self.grams, axis=0) * -1).tolist()
-            else:
-                outvec = None if self.grams == [] else np.mean(self.grams, axis=0).tolist()
-            # outvec = None if self.grams == [] else np.mean(self.grams, axis=0).tolist()
-            return outvec
+            temp_pre_name, _ = find_English_term(term=i)
+            rerank_subs.append(' '.join(self.get_subword(term=temp_pre_name, is_print=False)))
+        return synonym_subs, rerank_subs
 
-    def load_standard_vector(self) -> tuple:
+    def load_standard_vector(self, synonym_subs=None) -> tuple:
         """
         Load word vector for term(s)]
         Notice: We use the sub-words to get the word Embedding
                 instead of the original word!
+        :param synonym_subs: The precomputed sub-words of each term (see segment_synonyms), computed here if it's None
+        :return output_vec: Contiguous float32 matrix, each row is L2-normalized
+        :return output_term: Terms w.r.t. the rows of output_vec
         """
         output_vec = []
         output_term = []
 
         # Iterate the Standard and Synonym Terms
-        for i in self.standard_synonym:
+        for row, i in enumerate(self.standard_synonym):
             temp_out = []
 
             # Remove Punctuations from the synonym term
             i = remove_punctuation(term=i)
 
             # Get sub-words from the synonym term
-            subs = self.get_subword(term=i, is_print=False)  # Get Sub-words of this term
+            if synonym_subs is None:
+                subs = self.get_subword(term=i, is_print=False)  # Get Sub-words of this term
+            else:
+                subs = synonym_subs[row]
 
             # Iterate the terms
             for sub in subs:
                 outvec = self.get_embedding(term=sub)
 
-                if outvec is not None and outvec != []:
+                if outvec is not None:
                     temp_out.append(outvec)
 
             if temp_out != []:
-                temp_out = np.mean(temp_out, axis=0).tolist()
+                temp_out = np.mean(temp_out, axis=0)
                 output_vec.append(temp_out)
                 output_term.append(i)
+
+        # Normalize once here, so that Cosine Similarity is a single dot product
+        output_vec = normalize_vector(vec=output_vec)
         return output_vec, output_term
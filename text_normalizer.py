@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import numpy as np
+
+# The punctuations removed from the terms (the space is kept unless remove_space=True)
+PUNCTUATION = ['(', ')', '[', ']', '，', '。', '！', ',', '.', '!', '_', '\n', '-', '/',
+               '?', '？', ':', '：', '{', '}', '「', '」', '@', '#', '$', '%', '^', '&', '*',
+               '+', '=', '"', '~', '`', '|', '<', '>', '…', '￥', '〔', '〕', '“', '”', '—', '\\',
+               "'", ';', '、', '↓', '≤', '≥', '①', '②', '─', '【', '】', '°', '·', '﹒', '､',
+               '『', '』', '｜']
+
+# The English and numbers in the terms
+ENGLISH_PATTERN = re.compile(r'[a-zA-Z0-9]+')
+
+
+def Q2B_table() -> dict:
+    """
+    Get the translation table converting the full-width to half-width
+    :return table: {full-width code: half-width character}
+    """
+    table = {0x3000: ' '}
+    for inside_code in range(0xff01, 0xff5f):
+        table[inside_code] = chr(inside_code - 0xfee0)
+    return table
+
+
+def punctuation_table(remove_space: bool, to_half_width: bool) -> dict:
+    """
+    Get the translation table removing the punctuations
+    :param remove_space: Remove the spaces as well or not
+    :param to_half_width: Convert the full-width to half-width first or not,
+                          the full-width characters converted to a punctuation are removed
+    :return table: {code: replacement (None to be removed)}
+    """
+    removed = set(PUNCTUATION)
+    if remove_space:
+        removed.add(' ')
+
+    table = {}
+    if to_half_width:
+        table = {code: (None if char in removed else char) for code, char in Q2B_table().items()}
+    for char in removed:
+        table[ord(char)] = None
+    return table
+
+
+# Translation tables w.r.t. (remove_space, to_half_width), built once
+Q2B_TABLE = Q2B_table()
+PUNCTUATION_TABLES = {(remove_space, to_half_width): punctuation_table(remove_space=remove_space, to_half_width=to_half_width)
+                      for remove_space in (False, True) for to_half_width in (False, True)}
+
+
+def stringQ2B(ustring: str) -> str:
+    """
+    Convert full-width to half-width for a sentence or string
+    """
+    return ustring.translate(Q2B_TABLE)
+
+
+def remove_punctuation(term: str, remove_space=False, to_half_width=False) -> str:
+    """
+    Remove the punctuations from the string
+    :param term: The string
+    :param remove_space: Remove the spaces as well or not
+    :param to_half_width: Convert the full-width to half-width first or not
+    :return term: The string whose punctuations are removed
+    """
+    return term.translate(PUNCTUATION_TABLES[(remove_space, to_half_width)])
+
+
+def split_English(term: str) -> tuple:
+    """
+    Find and remove the English and numbers from the string
+    :param term: The string
+    :return term: The string whose English and numbers are removed
+    :return Eng_in_term: The English and numbers found in the string
+    """
+    Eng_in_term = ENGLISH_PATTERN.findall(term)
+    if Eng_in_term == []:
+        return term, Eng_in_term
+    return ENGLISH_PATTERN.sub('', term), Eng_in_term
+
+
+def remove_punctuation_batch(terms, remove_space=False, to_half_width=False):
+    """
+    Remove the punctuations from a list (or numpy array) of strings
+    :param terms: The strings
+    :param remove_space: Remove the spaces as well or not
+    :param to_half_width: Convert the full-width to half-width first or not
+    :return terms: The strings whose punctuations are removed, as the same type as the input
+    """
+    table = PUNCTUATION_TABLES[(remove_space, to_half_width)]
+    output = [term.translate(table) for term in terms]
+    if isinstance(terms, np.ndarray):
+        return np.array(output, dtype=object)
+    return output
+
+
+def split_English_batch(terms) -> tuple:
+    """
+    Find and remove the English and numbers from a list (or numpy array) of strings
+    :param terms: The strings
+    :return terms: The strings whose English and numbers are removed, as the same type as the input
+    :return Eng_in_terms: The English and numbers found in each string
+    """
+    output, Eng_in_terms = [], []
+    for term in terms:
+        term, Eng_in_term = split_English(term=term)
+        output.append(term)
+        Eng_in_terms.append(Eng_in_term)
+    if isinstance(terms, np.ndarray):
+        output = np.array(output, dtype=object)
+    return output, Eng_in_terms
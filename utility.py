@@ -5,8 +5,9 @@ import time
 import jieba
 import numpy as np
 import pandas as pd
-import re
 import codecs
+from vector_store import Word_Vector_Store, is_word_vector_store
+from text_normalizer import remove_punctuation, split_English
 
 
 def read_csv(path_txt: str) -> np.array:
@@ -20,30 +21,73 @@ def read_csv(path_txt: str) -> np.array:
     return csv
 
 
-def cos_similarity(vec1: list, vec2: list) -> list:
+def normalize_vector(vec: np.array) -> np.array:
     """
-    Calculate Cosine Similarity between a sample and X samples
-    :param vec1: One-dimensional vector [1 x Y]
-                 1: 1 sample
-                 Y: Y dimensional vector
-    :param vec2: Two-dimensional Matrix [X x Y]
-                 X: X different samples
-                 Y: Y dimensional vector
-    :return score: Scores of similarity w.r.t. X samples
+    L2-normalize the rows of a matrix (rows of zeros are kept as zeros)
+    :param vec: Two-dimensional Matrix [X x Y]
+    :return vec: Contiguous float32 matrix whose rows have unit length
     """
-    shape = np.shape(vec2)[0]
-    vec1 = np.tile(vec1, [shape, 1])
-    dot = np.sum(vec1 * vec2, axis=1)
-    normal = (np.linalg.norm(vec1, axis=1) * np.linalg.norm(vec2, axis=1))
-    score = (dot / normal).tolist()
-    return score
+    vec = np.array(vec, dtype=np.float32, ndmin=2)
+    norm = np.linalg.norm(vec, axis=1, keepdims=True)
+    norm[norm == 0] = 1
+    vec /= norm
+    return np.ascontiguousarray(vec)
+
+
+def top_k(score: np.array, k: int) -> tuple:
+    """
+    Get the top K scores and their indices, in descending order of the scores
+    The ties are broken by the indices (the smaller index first), so that the result is deterministic
+    The NaN scores are ranked last, as -inf
+    :param score: Scores [X], or a batch of scores [B x X]
+    :param k: K
+    :return index: Indices of the top K scores [K] or [B x K]
+    :return top: The top K scores [K] or [B x K]
+    """
+    score = np.asarray(score)
+    if score.ndim == 1:
+        index, top = top_k(score=score[None, :], k=k)
+        return index[0], top[0]
+
+    batch, num = score.shape
+    k = min(k, num)
+
+    # np.partition puts NaN after the largest score, so the K-th score could be NaN and match no score
+    if np.issubdtype(score.dtype, np.floating) and np.isnan(score).any():
+        score = np.where(np.isnan(score), -np.inf, score)
+
+    # The scores not less than the K-th largest score, found in O(X) by argpartition's selection
+    if k < num:
+        kth = np.partition(score, num - k, axis=1)[:, num - k]
+        mask = score >= kth[:, None]
+    else:
+        mask = np.ones(score.shape, dtype=bool)
+
+    if np.all(mask.sum(axis=1) == k):
+        index = np.nonzero(mask)[1].reshape(batch, k)
+    else:
+        # More scores than K tie with the K-th score, the smallest indices of them are kept
+        index = np.empty((batch, k), dtype=np.int64)
+        for row in range(batch):
+            candidate = np.flatnonzero(mask[row])
+            index[row] = candidate[np.argsort(-score[row, candidate], kind='stable')[:k]]
+
+    # Sort the top K scores, the index order is kept for the ties
+    top = np.take_along_axis(score, index, axis=1)
+    order = np.argsort(-top, axis=1, kind='stable')
+    return np.take_along_axis(index, order, axis=1), np.take_along_axis(top, order, axis=1)
 
 
 def load_word_vector(path: str, word_dim: int) -> dict:
     """
     Load standard-trained word vectors
+    The binary word vectors (see vector_store.py) are memory-mapped if they exist,
+    otherwise the text word vectors (word_vectors.vec) are parsed
     """
     print("Start to load standard-trained word embeddings!!")
+    if is_word_vector_store(path=path):
+        return Word_Vector_Store(path=path)
+
     wordvec = {}
     for i, line in enumerate(codecs.open(path + "word_vectors.vec", 'r', encoding='utf-8')):
         line = line.rstrip().split()
@@ -52,54 +96,69 @@ def load_word_vector(path: str, word_dim: int) -> dict:
     return wordvec
 
 
-def kmp(m_str: str, s_str: str) -> int:
-    """
-    KMP Algorithm (a String Matching Algorithm)
-    Reference: https://blog.csdn.net/achen0511/article/details/105983444/
-    :param m_str: Main string
-    :param s_str: Pattern String
-    :return: Location of the matched string, if didn't exist, return -1
+class AhoCorasick:
     """
-    next_ls = [-1] * len(s_str)
-    m = 1
-    s = 0
-
-    while m < len(s_str) - 1:
-        if s_str[m] == s_str[s] or s == -1:
-            m += 1
-            s += 1
-            next_ls[m] = s
-        else:
-            s = next_ls[s]
-
-    i = j = 0
-    while i < len(m_str) and j < len(s_str):
-        if m_str[i] == s_str[j] or j == -1:
-            i += 1
-            j += 1
-        else:
-            j = next_ls[j]
-
-    if j == len(s_str):
-        return i - j
-    return -1
-
-
-def remove_punctuation(term: str) -> str:
+    Aho-Corasick Automaton (a Multi-pattern String Matching Algorithm)
+    Compile the patterns once, and then find all of them in one pass over a text
+    Reference: https://en.wikipedia.org/wiki/Aho%E2%80%93Corasick_algorithm
     """
-    Remove the punctuations from the string
-    :param term: the term list or a string
-    :return term: the term whose punctuations are removed
-    """
-    punctuation = ['(', ')', '[', ']', '，', '。', '！', ',', '.', '!', '_', '\n', '-', '/', '',
-                   '?', '？', ':', '：', '{', '}', '「', '」', '@', '#', '$', '%', '^', '&', '*', '[]',
-                   '+', '=', '"', '~', '`', '|', '<', '>', '……', '￥', '〔', '〕', '“', '”', '—', '\\',
-                   "'", ';', '、', '↓', '≤', '≥', '①', '②', '─', '【', '】', '°', '·', '…', '﹒', '､',
-                   '『', '』', '｜']
-    for j in punctuation:
-        if j in term:
-            term = term.replace(j, '')
-    return term
+    def __init__(self, patterns: list):
+        """
+        :param patterns: Pattern strings, the repeated ones are kept as separate patterns
+        """
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        # Build the trie of the patterns
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = next_node
+            self.output[node].append(pattern_id)
+
+        # Build the failure links (Breadth-First Search)
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, next_node in self.goto[node].items():
+                queue.append(next_node)
+                fail = self.fail[node]
+                while fail != 0 and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(char, 0)
+                self.fail[next_node] = fail if fail != next_node else 0
+                self.output[next_node] = self.output[next_node] + self.output[self.fail[next_node]]
+
+    def find(self, text: str) -> set:
+        """
+        Find the patterns that occur in the text
+        :param text: Main string
+        :return found: IDs (indexes) of the patterns that occur at least once in the text
+        """
+        found = set(self.output[0])
+        node = 0
+        for char in text:
+            while node != 0 and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found.update(self.output[node])
+        return found
+
+    def count(self, text: str) -> int:
+        """
+        Count the patterns that occur in the text, each pattern is counted at most once
+        :param text: Main string
+        :return: Number of the patterns that occur in the text
+        """
+        return len(self.find(text=text))
 
 
 def find_English_term(term: str) -> tuple:
@@ -109,19 +168,8 @@ def find_English_term(term: str) -> tuple:
     :return term: the term whose English item(s) are removed
     :return Eng_in_term: the removed English item(s)
     """
-    Eng_in_term = []
-
-    # Find all the English from the term
-    result = re.findall(r'[a-zA-Z0-9]+', term)
-
-    # Remove the English from the term
-    for i in result:
-        term = re.sub(pattern=i, repl='', string=term)
+    term, result = split_English(term=term)
 
     # Lower case the English term
-    for j in range(len(result)):
-        result[j] = result[j].replace(result[j], result[j].lower())
-
-    # Find the term and the English containing in the term
-    Eng_in_term.append(result)
+    Eng_in_term = [[i.lower() for i in result]]
     return term, Eng_in_term
\ No newline at end of file
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import codecs
+import argparse
+import numpy as np
+
+MATRIX_FILE = 'word_vectors.npy'
+VOCAB_FILE = 'word_vectors.vocab'
+TEXT_FILE = 'word_vectors.vec'
+SCALE_FILE = 'word_vectors.scale.npy'
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+def quantize_int8(matrix: np.array) -> tuple:
+    """
+    Symmetric int8 quantization of each row: row ~= quantized row * scale
+    :param matrix: Two-dimensional Matrix [X x Y]
+    :return quantized: int8 matrix [X x Y], values in [-127, 127]
+    :return scale: float32 scale of each row [X] (0 for rows of zeros)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scale = np.abs(matrix).max(axis=1) / 127 if matrix.shape[1] != 0 else np.zeros(matrix.shape[0], dtype=np.float32)
+    safe_scale = np.where(scale == 0, 1, scale)
+    quantized = np.clip(np.rint(matrix / safe_scale[:, None]), -127, 127).astype(np.int8)
+    return quantized, scale.astype(np.float32)
+
+
+class Word_Vector_Store:
+    """
+    Binary, memory-mapped word vectors
+    A dictionary-like look-up: word -> row of a contiguous matrix [X x Y]
+    The matrix is mapped read-only, so that the pages are shared by all the processes
+    The matrix is float32, float16, or int8 with a scale per row (word_vectors.scale.npy),
+    the looked-up vectors are float32 whatever the precision is
+    """
+    def __init__(self, path: str):
+        """
+        :param path: The folder containing word_vectors.npy and word_vectors.vocab
+        """
+        self.matrix = np.load(path + MATRIX_FILE, mmap_mode='r')
+        self.scale = None
+        if self.matrix.dtype == np.int8:
+            check_scale(path=path)
+            self.scale = np.load(path + SCALE_FILE)
+            if self.scale.shape != (self.matrix.shape[0],):
+                raise ValueError('The scales {} do not match the int8 word vectors, please convert them again'.format(path + SCALE_FILE))
+        with open(path + VOCAB_FILE, 'r', encoding='utf-8', newline='\n') as fp:
+            words = fp.read().split('\n')[:self.matrix.shape[0]]
+
+        # Vocabulary offset table, a repeated word points to its last row (as dict assignment does)
+        self.index = {word: row for row, word in enumerate(words)}
+
+    def get(self, word: str, default=None):
+        """
+        Get the word vector, return the default if the word is out of vocabulary
+        """
+        row = self.index.get(word)
+        if row is None:
+            return default
+        return self.vector(row=row)
+
+    def vector(self, row: int) -> np.array:
+        """
+        Get the float32 vector of a row
+        """
+        if self.matrix.dtype == np.float32:
+            return self.matrix[row]
+        if self.scale is None:
+            return self.matrix[row].astype(np.float32)
+        return self.matrix[row].astype(np.float32) * self.scale[row]
+
+    def __getitem__(self, word: str) -> np.array:
+        return self.vector(row=self.index[word])
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        for word, row in self.index.items():
+            yield word, self.vector(row=row)
+
+
+def check_scale(path: str):
+    """
+    Check that the scales of the int8 word vectors exist and are not older than the matrix
+    (convert_word_vector replaces the matrix first, so an interrupted conversion leaves stale scales)
+    """
+    if not os.path.exists(path + SCALE_FILE):
+        raise ValueError('The scales {} of the int8 word vectors are missing, please convert them again'.format(path + SCALE_FILE))
+    if os.path.getmtime(path + SCALE_FILE) < os.path.getmtime(path + MATRIX_FILE):
+        raise ValueError('The scales {} are older than the int8 word vectors, please convert them again'.format(path + SCALE_FILE))
+
+
+def is_word_vector_store(path: str) -> bool:
+    """
+    Whether the binary word vectors exist, and are not older than the text word vectors
+    The int8 word vectors with missing or stale scales are refused (ValueError)
+    """
+    if not (os.path.exists(path + MATRIX_FILE) and os.path.exists(path + VOCAB_FILE)):
+        return False
+    if os.path.exists(path + TEXT_FILE) and os.path.getmtime(path + MATRIX_FILE) < os.path.getmtime(path + TEXT_FILE):
+        return False
+    if np.load(path + MATRIX_FILE, mmap_mode='r').dtype == np.int8:
+        check_scale(path=path)
+    return True
+
+
+def word_vector_files(path: str) -> list:
+    """
+    Get the files that load_word_vector() reads from the folder
+    """
+    if is_word_vector_store(path=path):
+        if np.load(path + MATRIX_FILE, mmap_mode='r').dtype == np.int8:
+            return [path + MATRIX_FILE, path + VOCAB_FILE, path + SCALE_FILE]
+        return [path + MATRIX_FILE, path + VOCAB_FILE]
+    return [path + TEXT_FILE]
+
+
+def convert_word_vector(path: str, word_dim: int, precision='float32') -> int:
+    """
+    Convert the text word vectors (word_vectors.vec) to the binary word vectors, one-time work
+        word_vectors.npy: float32 / float16 / int8 matrix [X x Y]
+        word_vectors.vocab: X words, one word per line
+        word_vectors.scale.npy: float32 scale of each row [X], only for int8
+    :param path: The folder of the word vectors
+    :param word_dim: Dimension of the word vectors
+    :param precision: 'float32', 'float16' (half the memory), or 'int8' (a quarter of the memory)
+    :return rows: Number of the converted word vectors
+    """
+    if precision not in PRECISIONS:
+        raise ValueError('Unknown precision: {}'.format(precision))
+
+    # First pass: count the word vectors, so that the matrix is written in place
+    rows = 0
+    for line in codecs.open(path + TEXT_FILE, 'r', encoding='utf-8'):
+        if len(line.rstrip().split()) == word_dim + 1:
+            rows += 1
+
+    # Second pass: write the matrix and the vocabulary (written to temporary files, then renamed)
+    dtype = np.float16 if precision == 'float16' else (np.int8 if precision == 'int8' else np.float32)
+    matrix = np.lib.format.open_memmap(path + MATRIX_FILE + '.tmp', mode='w+', dtype=dtype, shape=(rows, word_dim))
+    scale = np.zeros(rows, dtype=np.float32)
+    row = 0
+    with open(path + VOCAB_FILE + '.tmp', 'w', encoding='utf-8', newline='\n') as fp:
+        for line in codecs.open(path + TEXT_FILE, 'r', encoding='utf-8'):
+            line = line.rstrip().split()
+            if len(line) == word_dim + 1:
+                vec = np.array(line[1:], dtype=np.float64)
+                if precision == 'int8':
+                    quantized, row_scale = quantize_int8(matrix=vec[None, :])
+                    matrix[row], scale[row] = quantized[0], row_scale[0]
+                else:
+                    matrix[row] = vec
+                fp.write(line[0] + '\n')
+                row += 1
+    matrix.flush()
+    del matrix
+    if precision == 'int8':
+        with open(path + SCALE_FILE + '.tmp', 'wb') as fp:
+            np.save(fp, scale)
+
+    # The scales are replaced last, so that they are never newer than a matrix they don't belong to
+    os.replace(path + MATRIX_FILE + '.tmp', path + MATRIX_FILE)
+    os.replace(path + VOCAB_FILE + '.tmp', path + VOCAB_FILE)
+    if precision == 'int8':
+        os.replace(path + SCALE_FILE + '.tmp', path + SCALE_FILE)
+    elif os.path.exists(path + SCALE_FILE):
+        os.remove(path + SCALE_FILE)
+    return rows
+
+
+# The main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert word_vectors.vec to the binary, memory-mapped word vectors')
+    parser.add_argument('--path', default='data/', help='The folder of word_vectors.vec')
+    parser.add_argument('--word_dim', type=int, default=128, help='Dimension of the word vectors')
+    parser.add_argument('--precision', default='float32', choices=PRECISIONS, help='The precision of the binary word vectors')
+    args = parser.parse_args()
+
+    rows = convert_word_vector(path=args.path, word_dim=args.word_dim, precision=args.precision)
+    print('There are', rows, 'word vectors saved to', args.path + MATRIX_FILE, 'and', args.path + VOCAB_FILE)